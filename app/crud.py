@@ -0,0 +1,332 @@
+# app/crud.py
+# Shared DB helpers for forecasts and chatbot queries, used by several routers.
+
+from datetime import datetime
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import select, insert, update, or_, func, literal
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models, schemas
+from app.database import IS_SQLITE
+from app.utils import columnar, fast_json, forecast_stats
+from app.utils.forecast_cache import forecast_cache
+
+# forecast_type -> label key added by the GET endpoints
+FORECAST_LABELS = {
+    "daily": "day",      # e.g. "Sun", "Mon", "Tue"
+    "monthly": "month",  # e.g. "Oct", "Nov", "Dec"
+}
+
+EMPTY_RESPONSE = {
+    "query_id": None,
+    "query_text": None,
+    "response_text": None,
+    "response_time": None
+}
+
+
+def format_forecast_columns(dates, values, label_key: str):
+    """
+    Build the GET response body from datetime64[D] dates and float values.
+    label_key selects the extra label: "day" (Sun–Sat) or "month" (Jan–Dec).
+    Labels and ISO strings are computed for the whole array at once.
+    """
+    return {
+        "data": [
+            {label_key: label, "date": day, "rainfall": rainfall}
+            for label, day, rainfall in zip(
+                columnar.labels(dates, label_key).tolist(), columnar.iso_dates(dates), values.tolist()
+            )
+        ]
+    }
+
+
+def forecast_columns_body(dates, values, label_key: str):
+    """Columnar GET body: parallel arrays instead of one object per point."""
+    return {
+        "dates": columnar.iso_dates(dates),
+        "values": values.tolist(),
+        label_key: columnar.labels(dates, label_key).tolist()
+    }
+
+
+def format_forecast_points(points, label_key: str):
+    """format_forecast_columns() for (date, rainfall) pairs."""
+    dates, values = columnar.from_columns([p[0] for p in points], [p[1] for p in points])
+    return format_forecast_columns(dates, values, label_key)
+
+
+def item_columns(items: Sequence[schemas.ForecastItem]):
+    """ForecastItem list -> (datetime64[D] dates, float values), sorted by date."""
+    dates, values = columnar.from_columns([it.date for it in items], [it.rainfall for it in items])
+    return sort_series(dates, values)
+
+
+def sort_series(dates, values):
+    order = np.argsort(dates, kind="stable")
+    return dates[order], values[order]
+
+
+async def insert_forecasts(
+    db: AsyncSession,
+    forecasts: Sequence[Tuple[str, np.ndarray, np.ndarray, Optional[str]]],
+):
+    """
+    Insert (forecast_type, dates, values, location_id) series: one multi-row INSERT for the
+    forecasts, one for all of their points and one for their summaries (plus one history
+    read per type/location). location_id None is the global forecast.
+    Does not commit. Returns (id, created_at) per forecast, in order.
+    """
+    created_at = datetime.utcnow()
+    ids = (await db.execute(
+        insert(models.Forecast).returning(models.Forecast.id, sort_by_parameter_order=True),
+        [
+            {"forecast_type": forecast_type, "location_id": location_id, "created_at": created_at}
+            for forecast_type, _, _, location_id in forecasts
+        ]
+    )).scalars().all()
+
+    await db.execute(
+        insert(models.ForecastPoint),
+        [
+            {"forecast_id": forecast_id, "date": day, "rainfall": rainfall}
+            for forecast_id, (_, dates, values, _) in zip(ids, forecasts)
+            for day, rainfall in zip(dates.astype(object), values.tolist())
+        ]
+    )
+    stored = [(forecast_id, created_at) for forecast_id in ids]
+    await insert_forecast_summaries(db, forecasts, stored)
+    return stored
+
+
+async def forecast_history(db: AsyncSession, forecast_type: str, location_id: Optional[str], exclude_ids: Sequence[int]):
+    """
+    Points of the last SUMMARY_HISTORY_FORECASTS forecasts of a type and location (other than exclude_ids),
+    oldest forecast first and in insertion order within one, as (datetime64[D] dates, float values).
+    Repeated dates are kept: forecast_stats.latest_per_date() picks the last occurrence.
+    """
+    recent = (
+        select(models.Forecast.id)
+        .where(
+            models.Forecast.forecast_type == forecast_type,
+            models.Forecast.location_id.is_(None) if location_id is None else models.Forecast.location_id == location_id,
+            models.Forecast.id.not_in(exclude_ids),
+        )
+        .order_by(models.Forecast.created_at.desc(), models.Forecast.id.desc())
+        .limit(forecast_stats.SUMMARY_HISTORY_FORECASTS)
+        .scalar_subquery()
+    )
+    rows = (await db.execute(
+        select(models.ForecastPoint.date, models.ForecastPoint.rainfall)
+        .where(models.ForecastPoint.forecast_id.in_(recent))
+        .order_by(models.ForecastPoint.forecast_id, models.ForecastPoint.id)
+    )).all()
+    return columnar.from_columns([r[0] for r in rows], [r[1] for r in rows])
+
+
+def summary_body(forecast_type: str, location_id: Optional[str], forecast_id: int, created_at, dates, values, history) -> dict:
+    """GET /forecast_summary body for one forecast."""
+    return {
+        "forecast_id": forecast_id,
+        "forecast_type": forecast_type,
+        "location_id": location_id,
+        "created_at": created_at.isoformat(),
+        **forecast_stats.summarize(dates, values, *history),
+    }
+
+
+async def insert_forecast_summaries(db: AsyncSession, forecasts, stored):
+    """
+    Compute and insert the summary of each just-inserted forecast (same arguments as
+    insert_forecasts plus its result). History is read once per (type, location); a forecast's
+    history also includes the ones before it in the same batch.
+    """
+    new_ids = [forecast_id for forecast_id, _ in stored]
+    histories = {}
+    rows = []
+    for (forecast_type, dates, values, location_id), (forecast_id, created_at) in zip(forecasts, stored):
+        key = (forecast_type, location_id)
+        if key not in histories:
+            histories[key] = [await forecast_history(db, forecast_type, location_id, new_ids)]
+        series = histories[key]
+        history = forecast_stats.latest_per_date(
+            np.concatenate([d for d, _ in series]), np.concatenate([v for _, v in series])
+        )
+        body = summary_body(forecast_type, location_id, forecast_id, created_at, dates, values, history)
+        series.append((dates, values))
+        wettest = body.get("max") or {}
+        rows.append({
+            "forecast_id": forecast_id,
+            "forecast_type": forecast_type,
+            "location_id": location_id,
+            "created_at": created_at,
+            "total": body.get("total"),
+            "max_rainfall": wettest.get("rainfall"),
+            "max_date": datetime.strptime(wettest["date"], "%Y-%m-%d").date() if wettest else None,
+            "body": fast_json.dumps_str(body),
+        })
+    await db.execute(insert(models.ForecastSummary), rows)
+
+
+async def latest_forecast_summary(db: AsyncSession, forecast_type: str, location_id: Optional[str]):
+    """(forecast_id, created_at, body) of the newest summary, via ix_forecast_summaries_type_location_created."""
+    return (await db.execute(
+        select(models.ForecastSummary.forecast_id, models.ForecastSummary.created_at, models.ForecastSummary.body)
+        .where(
+            models.ForecastSummary.forecast_type == forecast_type,
+            models.ForecastSummary.location_id.is_(None) if location_id is None
+            else models.ForecastSummary.location_id == location_id,
+        )
+        .order_by(models.ForecastSummary.created_at.desc(), models.ForecastSummary.forecast_id.desc())
+        .limit(1)
+    )).first()
+
+
+def cache_forecast(forecast_type: str, forecast_id: int, created_at, dates, values):
+    """Write-through: store the series and its rendered JSON body (bytes) in forecast_cache."""
+    body = fast_json.dumps(format_forecast_columns(dates, values, FORECAST_LABELS[forecast_type]))
+    forecast_cache.set(forecast_type, forecast_id, created_at, body, dates, values)
+    return body
+
+
+async def latest_forecast(db: AsyncSession, forecast_type: str):
+    """(id, created_at) of the newest global forecast of a type, via ix_forecasts_global_type_created_at_id."""
+    return (await db.execute(
+        select(models.Forecast.id, models.Forecast.created_at)
+        .where(models.Forecast.forecast_type == forecast_type, models.Forecast.location_id.is_(None))
+        .order_by(models.Forecast.created_at.desc(), models.Forecast.id.desc())
+        .limit(1)
+    )).first()
+
+
+async def latest_location_forecasts(db: AsyncSession, forecast_type: str, location_ids: Sequence[str]):
+    """
+    Newest forecast of a type for each location, with its points, in two queries.
+    Returns {location_id: (forecast_id, created_at, dates, values)}; locations without one are absent.
+    """
+    ranked = (
+        select(
+            models.Forecast.id, models.Forecast.location_id, models.Forecast.created_at,
+            func.row_number().over(
+                partition_by=models.Forecast.location_id,
+                order_by=(models.Forecast.created_at.desc(), models.Forecast.id.desc())
+            ).label("rn")
+        )
+        .where(models.Forecast.forecast_type == forecast_type, models.Forecast.location_id.in_(location_ids))
+        .subquery()
+    )
+    latest = (await db.execute(select(ranked).where(ranked.c.rn == 1))).all()
+    if not latest:
+        return {}
+
+    points = {}
+    rows = await db.execute(
+        select(models.ForecastPoint.forecast_id, models.ForecastPoint.date, models.ForecastPoint.rainfall)
+        .where(models.ForecastPoint.forecast_id.in_([row.id for row in latest]))
+        .order_by(models.ForecastPoint.forecast_id, models.ForecastPoint.date)
+    )
+    for forecast_id, day, rainfall in rows:
+        points.setdefault(forecast_id, []).append((day, rainfall))
+
+    result = {}
+    for row in latest:
+        series = points.get(row.id, [])
+        dates, values = columnar.from_columns([p[0] for p in series], [p[1] for p in series])
+        result[row.location_id] = (row.id, row.created_at, dates, values)
+    return result
+
+
+async def forecast_points(db: AsyncSession, forecast_id: int):
+    """(date, rainfall) pairs of one forecast, in date order."""
+    return (await db.execute(
+        select(models.ForecastPoint.date, models.ForecastPoint.rainfall)
+        .where(models.ForecastPoint.forecast_id == forecast_id)
+        .order_by(models.ForecastPoint.date)
+    )).all()
+
+
+async def forecast_series(db: AsyncSession, forecast_id: int):
+    """forecast_points() as (datetime64[D] dates, float values) arrays; both empty if none."""
+    points = await forecast_points(db, forecast_id)
+    return columnar.from_columns([p.date for p in points], [p.rainfall for p in points])
+
+
+def latest_query_stmt(*user_filter):
+    """
+    SELECT user id plus the user's latest query, following users.latest_query_id
+    (a primary-key lookup rather than an ORDER BY over the user's history).
+    Query columns are NULL for users without queries; no row means no such user.
+    """
+    return (
+        select(
+            models.User.id.label("user_id"),
+            models.UserQuery.id, models.UserQuery.query_text, models.UserQuery.created_at,
+            models.UserQuery.response_text, models.UserQuery.response_time,
+        )
+        .outerjoin(models.UserQuery, models.UserQuery.id == models.User.latest_query_id)
+        .where(*user_filter)
+    )
+
+
+async def user_latest_query(db: AsyncSession, user_id: int):
+    """Row from latest_query_stmt() for one user, or None if the user does not exist."""
+    return (await db.execute(latest_query_stmt(models.User.id == user_id))).first()
+
+
+async def set_latest_query(db: AsyncSession, user_id: int, query_id: int):
+    """Advance users.latest_query_id to query_id (never backwards). Does not commit."""
+    await db.execute(
+        update(models.User)
+        .where(
+            models.User.id == user_id,
+            or_(models.User.latest_query_id.is_(None), models.User.latest_query_id < query_id),
+        )
+        .values(latest_query_id=query_id)
+    )
+
+
+async def insert_user_query(db: AsyncSession, user_id: int, query_text: str):
+    """
+    Insert a query for an existing user and advance users.latest_query_id, without a
+    separate existence check: INSERT ... SELECT FROM users inserts nothing for unknown users.
+    Returns (id, created_at), or None if the user does not exist. Does not commit.
+    PostgreSQL does it all in one statement (data-modifying CTE); SQLite needs two.
+    """
+    created_at = datetime.utcnow()
+    new_query = (
+        insert(models.UserQuery)
+        .from_select(
+            ["user_id", "query_text", "created_at"],
+            select(models.User.id, literal(query_text), literal(created_at)).where(models.User.id == user_id),
+        )
+        .returning(models.UserQuery.id)
+    )
+
+    if IS_SQLITE:
+        query_id = await db.scalar(new_query)
+        if query_id is None:
+            return None
+        await set_latest_query(db, user_id, query_id)
+        return query_id, created_at
+
+    new_query = new_query.cte("new_query")
+    query_id = await db.scalar(
+        update(models.User)
+        .where(models.User.id == user_id)
+        .values(latest_query_id=func.greatest(func.coalesce(models.User.latest_query_id, 0), new_query.c.id))
+        .returning(new_query.c.id)
+    )
+    return (query_id, created_at) if query_id is not None else None
+
+
+def response_body(query):
+    """JSON body describing one query (ORM object or row) and its possibly pending response."""
+    return {
+        "query_id": query.id,
+        "query_text": query.query_text,
+        "response_text": query.response_text,
+        "response_time": query.response_time.isoformat() if query.response_time else None,
+        "created_at": query.created_at.isoformat()
+    }
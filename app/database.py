@@ -1,9 +1,16 @@
 # app/database.py
-# Database initialization and session factory for PostgreSQL (Render) or SQLite (local fallback).
+# Async database engine and session factory for PostgreSQL (Render, via asyncpg) or SQLite (local fallback, via aiosqlite).
 
+import asyncio
+import hashlib
 import os
-from sqlalchemy import create_engine, inspect
-from sqlalchemy.orm import sessionmaker, declarative_base
+import tempfile
+from contextlib import asynccontextmanager
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.orm import declarative_base
+from app.utils.metrics import InstrumentedAsyncQueuePool, instrument_engine
 
 # ---- Environment Variable ----
 DATABASE_URL = os.getenv("DATABASE_URL")
@@ -15,40 +22,237 @@ if not DATABASE_URL:
 if DATABASE_URL.startswith("postgres://"):
     DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
 
+
+def _async_url(url: str):
+    """Swap the driver for its asyncio counterpart (asyncpg / aiosqlite)."""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend == "postgresql":
+        query = dict(url.query)
+        # asyncpg spells libpq's sslmode as ssl
+        if "sslmode" in query:
+            query["ssl"] = query.pop("sslmode")
+        return url.set(drivername="postgresql+asyncpg", query=query)
+    if backend == "sqlite":
+        return url.set(drivername="sqlite+aiosqlite")
+    return url
+
+
+ASYNC_DATABASE_URL = _async_url(DATABASE_URL)
+IS_SQLITE = ASYNC_DATABASE_URL.get_backend_name() == "sqlite"
+
+# ---- Pool Settings ----
+# Each worker process owns its own pool: pool_size + max_overflow connections at most.
+# Worker processes (gunicorn.conf.py exports its worker count here)
+WEB_CONCURRENCY = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+# Connections the whole service may open across its workers (Render plans cap them); 0 = no budget.
+# Each worker keeps one of its share for the invalidation bus listener (app/invalidation.py).
+DB_CONNECTION_BUDGET = int(os.getenv("DB_CONNECTION_BUDGET", "0"))
+
+
+# Pooled connections a worker needs at least: startup_lock/try_advisory_lock hold one while the
+# locked work (init_db, retention batches) opens another
+MIN_POOLED_PER_WORKER = 2
+
+
+def pool_limits(budget: int, workers: int, reserved: int = 1):
+    """
+    (pool_size, max_overflow) per worker so workers * (both + reserved) stays within budget.
+    RuntimeError when the budget cannot give every worker MIN_POOLED_PER_WORKER pooled connections.
+    """
+    per_worker = budget // workers - reserved
+    if per_worker < MIN_POOLED_PER_WORKER:
+        raise RuntimeError(
+            f"❌ DB_CONNECTION_BUDGET={budget} is too small for {workers} workers: each needs "
+            f"{MIN_POOLED_PER_WORKER + reserved} connections, so set at least {workers * (MIN_POOLED_PER_WORKER + reserved)} "
+            f"or lower WEB_CONCURRENCY."
+        )
+    pool_size = max(1, per_worker // 2)
+    return pool_size, per_worker - pool_size
+
+
+_budget_pool, _budget_overflow = pool_limits(DB_CONNECTION_BUDGET, WEB_CONCURRENCY) if DB_CONNECTION_BUDGET > 0 else (5, 10)
+# Explicit values win over the budget
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", str(_budget_pool)))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", str(_budget_overflow)))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # seconds; below Render's idle cutoff
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+engine_kwargs = {}
+if not IS_SQLITE:
+    # SQLite connections are local files; the dialect picks its own pool.
+    engine_kwargs.update(
+        poolclass=InstrumentedAsyncQueuePool,  # records checkout wait for /metrics
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+    )
+
 # ---- Engine Setup ----
-engine = create_engine(
-    DATABASE_URL,
+engine = create_async_engine(
+    ASYNC_DATABASE_URL,
     echo=False,  # Change to True if you want SQL logs
+    **engine_kwargs,
 )
+instrument_engine(engine)
 
 # ---- Session Setup ----
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+# expire_on_commit=False: async sessions cannot lazy-load attributes after commit.
+SessionLocal = async_sessionmaker(bind=engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
 
 # ---- Base Class for Models ----
 Base = declarative_base()
 
-def get_db():
-    """Yields a new SQLAlchemy database session."""
-    db = SessionLocal()
-    try:
+
+async def get_db():
+    """Yields a new async SQLAlchemy database session."""
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
-def init_db():
-    """Initializes or rebuilds database tables (for Render PostgreSQL)."""
-    from app import models
-    inspector = inspect(engine)
+
+def _create_missing_indexes(conn):
+    """create_all() skips indexes on tables that already exist; add any that are new."""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+
+def _add_missing_columns(conn):
+    """
+    create_all() never alters existing tables: add new nullable columns in place.
+    Returns the added columns as "table.column" strings.
+    """
+    inspector = inspect(conn)
+    existing_tables = set(inspector.get_table_names())
+    added = []
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {col["name"] for col in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or not column.nullable:
+                continue
+            column_type = column.type.compile(dialect=conn.dialect)
+            conn.exec_driver_sql(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}')
+            added.append(f"{table.name}.{column.name}")
+    return added
+
+
+def _init_schema(conn):
+    """Synchronous schema work, run on the async connection via run_sync."""
+    from app.migrations.forecast_points import relax_forecast_data, migrate_forecast_points
+    from app.migrations.latest_query import backfill_latest_query_ids
+
+    inspector = inspect(conn)
     tables = inspector.get_table_names()
 
     if "users" in tables:
         columns = [col["name"] for col in inspector.get_columns("users")]
         if "email" not in columns:
             print("⚠️ Outdated schema detected — rebuilding database...")
-            Base.metadata.drop_all(bind=engine)
-            Base.metadata.create_all(bind=engine)
+            Base.metadata.drop_all(bind=conn)
+            Base.metadata.create_all(bind=conn)
             print("✅ Database successfully rebuilt with latest schema.")
             return
 
-    Base.metadata.create_all(bind=engine)
+    relax_forecast_data(conn)
+    Base.metadata.create_all(bind=conn)
+    added = _add_missing_columns(conn)
+    _create_missing_indexes(conn)
+    migrate_forecast_points(conn)
+    if "users.latest_query_id" in added:
+        backfill_latest_query_ids(conn)
     print("✅ PostgreSQL database initialized successfully.")
+
+
+async def init_db():
+    """Initializes or rebuilds database tables (for Render PostgreSQL)."""
+    from app import models
+    async with engine.begin() as conn:
+        await conn.run_sync(_init_schema)
+
+
+# Arbitrary app-wide key for pg_advisory_lock; every worker must use the same value.
+STARTUP_LOCK_KEY = 524_713_001
+
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, run as a single process
+    fcntl = None
+
+
+def _lock_path(key: int) -> str:
+    """Lock file for key, per database: SQLite workers on one host coordinate through it."""
+    digest = hashlib.sha1(f"{DATABASE_URL}:{key}".encode()).hexdigest()[:16]
+    return os.path.join(tempfile.gettempdir(), f"rainfall-api-{digest}.lock")
+
+
+@asynccontextmanager
+async def _file_lock(key: int, wait: bool):
+    """flock() counterpart of the advisory locks for SQLite. Yields whether the lock was taken at once."""
+    if fcntl is None:
+        yield True
+        return
+    with open(_lock_path(key), "w") as handle:
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            acquired = True
+        except BlockingIOError:
+            acquired = False
+            if wait:
+                await asyncio.to_thread(fcntl.flock, handle, fcntl.LOCK_EX)
+        try:
+            yield acquired
+        finally:
+            if acquired or wait:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+@asynccontextmanager
+async def startup_lock():
+    """
+    Serialize one-time startup work (schema, seeding) across worker processes.
+    Yields True in the worker that should do the work; workers that found it in
+    progress wait for it to finish and get False.
+    SQLite workers share one host: a lock file plays the advisory lock's part.
+    """
+    if IS_SQLITE:
+        async with _file_lock(STARTUP_LOCK_KEY, wait=True) as leader:
+            yield leader
+        return
+
+    async with engine.connect() as conn:
+        params = {"key": STARTUP_LOCK_KEY}
+        leader = await conn.scalar(text("SELECT pg_try_advisory_lock(:key)"), params)
+        if not leader:
+            await conn.scalar(text("SELECT pg_advisory_lock(:key)"), params)
+        try:
+            yield leader
+        finally:
+            await conn.scalar(text("SELECT pg_advisory_unlock(:key)"), params)
+
+
+@asynccontextmanager
+async def try_advisory_lock(key: int):
+    """
+    Hold pg_advisory_lock(key) for the block without waiting for it:
+    yields False (and holds nothing) when another worker already has it.
+    SQLite: a lock file on this host instead.
+    """
+    if IS_SQLITE:
+        async with _file_lock(key, wait=False) as acquired:
+            yield acquired
+        return
+
+    async with engine.connect() as conn:
+        params = {"key": key}
+        acquired = await conn.scalar(text("SELECT pg_try_advisory_lock(:key)"), params)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                await conn.scalar(text("SELECT pg_advisory_unlock(:key)"), params)
@@ -0,0 +1,40 @@
+# app/dependencies.py
+# Shared FastAPI dependencies: user-existence check backed by an in-process cache of known user ids.
+
+import os
+
+from fastapi import Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_db
+from app import models
+from app.utils.lru_cache import LRUCache
+
+# Users are never deleted by the API, so a positive answer stays valid; the TTL bounds
+# staleness after manual deletes. Unknown ids are not cached (signup may create them).
+known_users = LRUCache(
+    maxsize=int(os.getenv("USER_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("USER_CACHE_TTL", "600")),
+)
+
+
+def remember_user(user_id: int):
+    """Mark a user id as existing (called after signup)."""
+    known_users.set(user_id, True)
+
+
+async def ensure_user(db: AsyncSession, user_id: int):
+    """404 unless the user exists. Costs no query once the id is cached."""
+    if known_users.get(user_id):
+        return
+    found = await db.scalar(select(models.User.id).where(models.User.id == user_id))
+    if found is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    remember_user(user_id)
+
+
+async def existing_user_id(user_id: int = Query(...), db: AsyncSession = Depends(get_db)) -> int:
+    """Dependency for routes taking ?user_id=: validates it and returns it."""
+    await ensure_user(db, user_id)
+    return user_id
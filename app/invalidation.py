@@ -0,0 +1,85 @@
+# app/invalidation.py
+# Cross-worker invalidation of in-process state. A worker that changes shared state updates its own
+# copy directly and publishes a message here; the other workers apply it in their handlers below.
+#   forecast_cache  -> "forecast" (newest id per type, or drop a type / everything)
+#   location_index  -> "location" (upsert / remove one point)
+#   long-poll waits -> "chatbot_response" (wake waiters of a user; they re-read the DB)
+# png_cache (keyed by forecast id) and known_users (user ids only ever appear) cannot go stale.
+
+import os
+
+from sqlalchemy.engine import make_url
+
+from app.database import DATABASE_URL, IS_SQLITE
+from app.utils.bus import LocalBus, PostgresBus
+from app.utils.forecast_cache import forecast_cache
+from app.utils.notifier import response_notifier, RECHECK
+from app.utils.spatial import location_index
+
+# "postgres" (LISTEN/NOTIFY, the default on PostgreSQL) or "local" (single worker / SQLite)
+INVALIDATION_BUS = os.getenv("INVALIDATION_BUS", "local" if IS_SQLITE else "postgres").lower()
+
+FORECAST_CHANNEL = "forecast"
+LOCATION_CHANNEL = "location"
+RESPONSE_CHANNEL = "chatbot_response"
+
+
+def _make_bus():
+    if INVALIDATION_BUS == "postgres" and not IS_SQLITE:
+        # asyncpg directly (not the SQLAlchemy pool); it understands libpq's sslmode
+        dsn = make_url(DATABASE_URL).set(drivername="postgresql").render_as_string(hide_password=False)
+        return PostgresBus(dsn)
+    return LocalBus()
+
+
+bus = _make_bus()
+
+
+# ---- Publishing (call after commit) ----
+def forecast_stored(forecast_type: str, forecast_id: int):
+    bus.publish(FORECAST_CHANNEL, {"forecast_type": forecast_type, "forecast_id": forecast_id})
+
+
+def forecasts_invalidated(forecast_type=None):
+    bus.publish(FORECAST_CHANNEL, {"forecast_type": forecast_type, "forecast_id": None})
+
+
+def location_changed(location_id: str, lat=None, lon=None):
+    bus.publish(LOCATION_CHANNEL, {"id": location_id, "lat": lat, "lon": lon})
+
+
+def response_posted(user_id: int, query_id: int):
+    bus.publish(RESPONSE_CHANNEL, {"user_id": user_id, "query_id": query_id})
+
+
+# ---- Handlers (other workers' messages) ----
+def _on_forecast(payload):
+    forecast_id = payload["forecast_id"]
+    if forecast_id is None:
+        forecast_cache.invalidate(payload["forecast_type"])
+    else:
+        forecast_cache.newer_exists(payload["forecast_type"], forecast_id)
+
+
+def _on_location(payload):
+    if payload["lat"] is not None and payload["lon"] is not None:
+        location_index.upsert(payload["id"], payload["lat"], payload["lon"])
+    else:
+        location_index.remove(payload["id"])
+
+
+def _on_response(payload):
+    response_notifier.notify(payload["user_id"], RECHECK)
+
+
+def _on_reset():
+    # Messages were missed: forget everything that may have changed meanwhile
+    forecast_cache.invalidate()
+    location_index.clear()  # reloaded from the DB on next use
+    response_notifier.wake_all(RECHECK)
+
+
+bus.subscribe(FORECAST_CHANNEL, _on_forecast)
+bus.subscribe(LOCATION_CHANNEL, _on_location)
+bus.subscribe(RESPONSE_CHANNEL, _on_response)
+bus.on_reset(_on_reset)
@@ -0,0 +1,298 @@
+# app/jobs/retention.py
+# Retention and compaction of forecast and query history, in short batched transactions.
+# Background loop: started by the lifespan handler when RETENTION_INTERVAL_SECONDS > 0.
+# Manual run: POST /maintenance/retention/run, or python -m app.jobs.retention [--dry-run]
+
+import argparse
+import asyncio
+import gzip
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import select, delete, func, or_
+
+from app.database import SessionLocal, try_advisory_lock
+from app import models
+from app.utils import fast_json
+
+# ---- Policy ----
+# Seconds between background runs; 0 disables the loop (manual runs still work)
+RETENTION_INTERVAL_SECONDS = float(os.getenv("RETENTION_INTERVAL_SECONDS", "0"))
+# Newest forecasts kept untouched per (forecast_type, location)
+FORECAST_KEEP_LATEST = max(1, int(os.getenv("FORECAST_KEEP_LATEST", "50")))
+# Older forecasts are thinned to the last one of each UTC day for this many days, then deleted
+FORECAST_KEEP_DAILY_DAYS = int(os.getenv("FORECAST_KEEP_DAILY_DAYS", "365"))
+# Answered queries older than this move to gzipped NDJSON files; 0 disables archiving
+QUERY_ARCHIVE_AFTER_DAYS = int(os.getenv("QUERY_ARCHIVE_AFTER_DAYS", "0"))
+QUERY_ARCHIVE_DIR = os.getenv("QUERY_ARCHIVE_DIR", "archive")
+# Rows per transaction, and the pause between transactions so request traffic gets the locks
+RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", "500"))
+RETENTION_BATCH_PAUSE = float(os.getenv("RETENTION_BATCH_PAUSE", "0.05"))
+
+# pg_advisory_lock key: one run at a time across all workers
+RETENTION_LOCK_KEY = 524_713_002
+
+
+def expired_forecasts_stmt(now: datetime):
+    """
+    Ids of forecasts outside the policy: beyond the newest FORECAST_KEEP_LATEST of their
+    (type, location), and either not the last of their UTC day or older than FORECAST_KEEP_DAILY_DAYS.
+    The latest forecast of every type and location is always kept.
+    """
+    partition = (models.Forecast.forecast_type, models.Forecast.location_id)
+    newest_first = (models.Forecast.created_at.desc(), models.Forecast.id.desc())
+    ranked = select(
+        models.Forecast.id,
+        models.Forecast.created_at,
+        func.row_number().over(partition_by=partition, order_by=newest_first).label("rank"),
+        func.row_number().over(
+            partition_by=partition + (func.date(models.Forecast.created_at),), order_by=newest_first
+        ).label("day_rank"),
+    ).subquery()
+    return (
+        select(ranked.c.id)
+        .where(
+            ranked.c.rank > FORECAST_KEEP_LATEST,
+            or_(ranked.c.day_rank > 1, ranked.c.created_at < now - timedelta(days=FORECAST_KEEP_DAILY_DAYS)),
+        )
+        .order_by(ranked.c.id)
+    )
+
+
+def archivable_queries_stmt(cutoff: datetime, after_id: int, limit: int):
+    """
+    Next batch of answered queries created before cutoff, by id.
+    A query that is still some user's latest_query_id stays: GET /chatbot_response reads it.
+    """
+    current = select(models.User.latest_query_id).where(models.User.latest_query_id.is_not(None))
+    return (
+        select(
+            models.UserQuery.id, models.UserQuery.user_id, models.UserQuery.query_text,
+            models.UserQuery.created_at, models.UserQuery.response_text, models.UserQuery.response_time,
+        )
+        .where(
+            models.UserQuery.id > after_id,
+            models.UserQuery.created_at < cutoff,
+            models.UserQuery.response_text.is_not(None),
+            models.UserQuery.id.not_in(current),
+        )
+        .order_by(models.UserQuery.id)
+        .limit(limit)
+    )
+
+
+def _append_archive(path: str, rows) -> None:
+    """Append rows as one gzip member of NDJSON and fsync, so they are on disk before the delete."""
+    lines = b"".join(
+        fast_json.dumps({
+            "id": row.id,
+            "user_id": row.user_id,
+            "query_text": row.query_text,
+            "created_at": row.created_at.isoformat() if row.created_at else None,
+            "response_text": row.response_text,
+            "response_time": row.response_time.isoformat() if row.response_time else None,
+        }) + b"\n"
+        for row in rows
+    )
+    with open(path, "ab") as raw:
+        # Concatenated gzip members read back as one stream (gzip -dc, gzip.open)
+        with gzip.GzipFile(fileobj=raw, mode="wb") as member:
+            member.write(lines)
+        raw.flush()
+        os.fsync(raw.fileno())
+
+
+class RetentionJob:
+    """
+    Runs the retention policy once (run_once) or every RETENTION_INTERVAL_SECONDS (start/stop).
+    Every batch is its own short transaction, so an interrupted run just resumes next time;
+    archived queries are written before they are deleted (an interruption in between can
+    leave a row in two archive files, never in none).
+    status() reports the current or last run for GET /maintenance/retention.
+    """
+
+    def __init__(self):
+        self.current: Optional[Dict[str, Any]] = None
+        self.last_run: Optional[Dict[str, Any]] = None
+        self.next_run_at: Optional[datetime] = None
+        self.forecasts_deleted = 0
+        self.queries_archived = 0
+        self._loop_task: Optional[asyncio.Task] = None
+        self._manual_task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self.current is not None
+
+    async def run_once(self, dry_run: bool = False) -> Dict[str, Any]:
+        """Apply the policy now. dry_run only counts what would be removed. Returns the run report."""
+        if self.running:
+            raise RuntimeError("A retention run is already in progress")
+        now = datetime.utcnow()
+        report = self.current = {
+            "started_at": now.isoformat(),
+            "finished_at": None,
+            "dry_run": dry_run,
+            "phase": "waiting for lock",
+            "forecasts_expired": 0,
+            "forecasts_deleted": 0,
+            "points_deleted": 0,
+            "queries_archived": 0,
+            "archive_file": None,
+            "batches": 0,
+            "error": None,
+        }
+        try:
+            async with try_advisory_lock(RETENTION_LOCK_KEY) as acquired:
+                if not acquired:
+                    report["phase"] = "skipped: running in another worker"
+                else:
+                    await self._compact_forecasts(report, now, dry_run)
+                    if QUERY_ARCHIVE_AFTER_DAYS > 0:
+                        await self._archive_queries(report, now, dry_run)
+                    report["phase"] = "done"
+        except asyncio.CancelledError:
+            report["error"] = "cancelled"
+            raise
+        except Exception as exc:
+            report["error"] = f"{type(exc).__name__}: {exc}"
+            print(f"⚠️ Retention run failed in phase {report['phase']!r}: {report['error']}")
+            raise
+        finally:
+            report["finished_at"] = datetime.utcnow().isoformat()
+            self.last_run, self.current = report, None
+        if not dry_run and (report["forecasts_deleted"] or report["queries_archived"]):
+            print(
+                f"✅ Retention: deleted {report['forecasts_deleted']} forecast(s), "
+                f"archived {report['queries_archived']} query(ies)."
+            )
+        return report
+
+    async def _compact_forecasts(self, report, now: datetime, dry_run: bool):
+        report["phase"] = "forecasts"
+        async with SessionLocal() as db:
+            ids: List[int] = list((await db.execute(expired_forecasts_stmt(now))).scalars())
+        report["forecasts_expired"] = len(ids)
+        if dry_run:
+            return
+        for start in range(0, len(ids), RETENTION_BATCH_SIZE):
+            batch = ids[start:start + RETENTION_BATCH_SIZE]
+            async with SessionLocal() as db:
+                # Points and summaries explicitly: SQLite does not enforce ON DELETE CASCADE without PRAGMA foreign_keys
+                points = await db.execute(delete(models.ForecastPoint).where(models.ForecastPoint.forecast_id.in_(batch)))
+                await db.execute(delete(models.ForecastSummary).where(models.ForecastSummary.forecast_id.in_(batch)))
+                forecasts = await db.execute(delete(models.Forecast).where(models.Forecast.id.in_(batch)))
+                await db.commit()
+            report["points_deleted"] += points.rowcount
+            report["forecasts_deleted"] += forecasts.rowcount
+            report["batches"] += 1
+            self.forecasts_deleted += forecasts.rowcount
+            await asyncio.sleep(RETENTION_BATCH_PAUSE)
+
+    async def _archive_queries(self, report, now: datetime, dry_run: bool):
+        report["phase"] = "queries"
+        cutoff = now - timedelta(days=QUERY_ARCHIVE_AFTER_DAYS)
+        if dry_run:
+            async with SessionLocal() as db:
+                pending = archivable_queries_stmt(cutoff, 0, None).order_by(None).subquery()
+                report["queries_archived"] = await db.scalar(select(func.count()).select_from(pending))
+            return
+
+        path = os.path.join(QUERY_ARCHIVE_DIR, f"users_queries-{now:%Y%m%dT%H%M%S}.ndjson.gz")
+        after_id = 0
+        while True:
+            async with SessionLocal() as db:
+                rows = (await db.execute(archivable_queries_stmt(cutoff, after_id, RETENTION_BATCH_SIZE))).all()
+                if not rows:
+                    break
+                if report["archive_file"] is None:
+                    os.makedirs(QUERY_ARCHIVE_DIR, exist_ok=True)
+                    report["archive_file"] = path
+                await asyncio.to_thread(_append_archive, path, rows)
+                # Same predicate as the select: a row that became someone's latest query meanwhile stays
+                current = select(models.User.latest_query_id).where(models.User.latest_query_id.is_not(None))
+                result = await db.execute(
+                    delete(models.UserQuery)
+                    .where(models.UserQuery.id.in_([row.id for row in rows]), models.UserQuery.id.not_in(current))
+                )
+                await db.commit()
+            after_id = rows[-1].id
+            report["queries_archived"] += result.rowcount
+            report["batches"] += 1
+            self.queries_archived += result.rowcount
+            await asyncio.sleep(RETENTION_BATCH_PAUSE)
+
+    # ---- Scheduling ----
+    def start(self):
+        """Start the background loop (lifespan startup); a no-op when RETENTION_INTERVAL_SECONDS is 0."""
+        if RETENTION_INTERVAL_SECONDS > 0 and self._loop_task is None:
+            self._loop_task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        """Cancel the loop and any manual run (lifespan shutdown); the current batch is rolled back."""
+        for task in (self._loop_task, self._manual_task):
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except (asyncio.CancelledError, Exception):
+                    pass
+        self._loop_task = self._manual_task = None
+        self.next_run_at = None
+
+    def trigger(self, dry_run: bool = False):
+        """Start a run in the background for POST /maintenance/retention/run. RuntimeError if one is active."""
+        if self.running or (self._manual_task is not None and not self._manual_task.done()):
+            raise RuntimeError("A retention run is already in progress")
+        self._manual_task = asyncio.create_task(self._run_quietly(dry_run))
+
+    async def _run_quietly(self, dry_run: bool):
+        try:
+            await self.run_once(dry_run)
+        except Exception:
+            pass  # recorded in last_run["error"]
+
+    async def _loop(self):
+        while True:
+            self.next_run_at = datetime.utcnow() + timedelta(seconds=RETENTION_INTERVAL_SECONDS)
+            await asyncio.sleep(RETENTION_INTERVAL_SECONDS)
+            if not self.running:
+                await self._run_quietly(dry_run=False)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "current": self.current,
+            "last_run": self.last_run,
+            "next_run_at": self.next_run_at.isoformat() if self.next_run_at else None,
+            "policy": {
+                "interval_seconds": RETENTION_INTERVAL_SECONDS,
+                "forecast_keep_latest": FORECAST_KEEP_LATEST,
+                "forecast_keep_daily_days": FORECAST_KEEP_DAILY_DAYS,
+                "query_archive_after_days": QUERY_ARCHIVE_AFTER_DAYS,
+                "query_archive_dir": QUERY_ARCHIVE_DIR,
+                "batch_size": RETENTION_BATCH_SIZE,
+            },
+        }
+
+
+retention_job = RetentionJob()
+
+
+async def main():
+    from app.database import engine
+
+    parser = argparse.ArgumentParser(description="Apply the forecast/query retention policy once.")
+    parser.add_argument("--dry-run", action="store_true", help="only count what would be removed")
+    args = parser.parse_args()
+    try:
+        report = await retention_job.run_once(dry_run=args.dry_run)
+    finally:
+        await engine.dispose()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,22 +1,113 @@
 # app/main.py
-# FastAPI app entrypoint. Initializes PostgreSQL DB and mounts routers.
+# FastAPI app entrypoint. Initializes PostgreSQL DB (in the lifespan handler) and mounts routers.
 
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.database import init_db, SessionLocal
-from app import models  # ✅ make sure models are imported before init_db()
-from app.routers import auth, user_input, chatbot, forecast
-from datetime import datetime
-import json
+from fastapi.responses import PlainTextResponse
+from sqlalchemy import select
+from app.database import init_db, SessionLocal, engine, startup_lock, DB_POOL_SIZE, DB_MAX_OVERFLOW
+from app import models, crud, schemas, invalidation  # ✅ make sure models are imported before init_db()
+from app.routers import auth, user_input, chatbot, forecast, ingest, agent, locations, maintenance
+from app.jobs.retention import retention_job
+from app.migrations.forecast_summaries import backfill_forecast_summaries
+from app.utils import plot_utils
+from app.utils.plot_utils import shutdown_plot_executor
+from app.utils import passwords
+from app.utils.compression import CompressionMiddleware
+from app.utils.fast_json import FastJSONResponse
+from app.utils.rate_limit import (
+    RateLimiter, AdmissionControl, InMemoryBackend, RateLimitMiddleware, limit, parse_limit, RATE_LIMIT_DEFAULT,
+)
+from app.utils.metrics import MetricsMiddleware, register_collector, gauge_lines, render_metrics
+from app.utils.forecast_cache import forecast_cache
+from app.utils.notifier import response_notifier
+from app.utils.drain import drain
+from app.dependencies import known_users
+
+
+# ---- Seed dummy data ----
+async def seed_dummy_data():
+    async with SessionLocal() as db:
+        if await db.scalar(select(models.Forecast.id).limit(1)) is None:
+            print("🌱 Inserting dummy forecast data...")
+            # Same path as the agent POSTs, so the dummy forecasts get summaries too
+            await crud.insert_forecasts(db, [
+                (forecast_type, *crud.item_columns([schemas.ForecastItem(**it) for it in dummy]), None)
+                for forecast_type, dummy in (("daily", forecast.DUMMY_DAILY), ("monthly", forecast.DUMMY_MONTHLY))
+            ])
+            await db.commit()
+            print("✅ Dummy forecast data inserted successfully.")
+        else:
+            print("✅ Forecast data already exists — skipping dummy insert.")
+
+
+# ---- Startup / shutdown ----
+# Schema work runs here rather than at import: importing the app stays cheap and
+# async engine connections are bound to the server's event loop.
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    async with startup_lock() as leader:
+        if leader:
+            await init_db()
+            await seed_dummy_data()
+            await backfill_forecast_summaries()
+    await invalidation.bus.start()
+    retention_job.start()  # no-op unless RETENTION_INTERVAL_SECONDS > 0
+    # SIGTERM (gunicorn, Render deploys): answer long-polls and stop jobs while connections drain
+    drain.reset()
+    response_notifier.open()
+    drain.on_drain(response_notifier.close)
+    drain.on_drain(retention_job.stop)
+    drain.install_signal_handlers()
+    yield
+    drain.begin()  # no-op if a signal already started it
+    await drain.wait()
+    await invalidation.bus.stop()
+    shutdown_plot_executor()
+    passwords.shutdown_password_executor()
+    await engine.dispose()
+
 
 app = FastAPI(
     title="Rainfall Project SAIL - Forecast API",
     version="1.0.0",
-    description="Backend for rainfall forecasts, user queries, and agent-posted data."
+    description="Backend for rainfall forecasts, user queries, and agent-posted data.",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,  # orjson when installed
 )
 
-# ---- Initialize database ----
-init_db()
+# ---- Rate limits ----
+# Token bucket per client address and route: limit(n, seconds) allows n requests per `seconds` on
+# average, in bursts of up to n (or burst=). Keys are "METHOD /path"; a trailing * matches a prefix.
+RATE_LIMITS = {
+    "POST /auth/login": limit(10, 60),
+    "POST /auth/signup": limit(5, 60),
+    "POST /user_input": limit(30, 60),
+    "POST /daily_forecast": limit(30, 60),  # unauthenticated agent endpoints
+    "POST /monthly_forecast": limit(30, 60),
+    "POST /batch": limit(60, 60),
+    "PUT /locations/*": limit(60, 60),
+    "POST /locations/*": limit(60, 60),
+    "GET /daily_forecast.png": limit(30, 60),
+    "GET /monthly_forecast.png": limit(30, 60),
+    "POST /forecast_cache/invalidate": limit(10, 60),
+    "POST /maintenance/*": limit(2, 60),
+}
+# Everything else: unlimited unless RATE_LIMIT_DEFAULT is set (one shared "default" bucket per client)
+rate_limiter = RateLimiter(RATE_LIMITS, default=parse_limit(RATE_LIMIT_DEFAULT), backend=InMemoryBackend())
+
+# Admission control: requests past this many in flight queue briefly, then get 503, instead of
+# piling up on the DB pool (pool_size + max_overflow connections per worker).
+admission = AdmissionControl(
+    max_concurrency=int(os.getenv("MAX_CONCURRENT_REQUESTS", str((DB_POOL_SIZE + DB_MAX_OVERFLOW) * 2))),
+    max_queue=int(os.getenv("ADMISSION_QUEUE_SIZE", "100")),
+    queue_timeout=float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "1.0")),
+    exempt=("/status", "/metrics", "/chatbot_response/wait"),  # long-polls mostly sleep; they do not hold the pool
+)
+# Innermost of the middlewares: 429/503 responses still get CORS headers, and run before any route or get_db
+app.add_middleware(RateLimitMiddleware, limiter=rate_limiter, admission=admission)
 
 # ---- CORS ----
 origins = [
@@ -32,53 +123,72 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"]
 )
+# gzip/Brotli for bodies over COMPRESSION_MIN_SIZE bytes (app/utils/compression.py)
+app.add_middleware(CompressionMiddleware)
+# Outermost: times the full request, including CORS handling
+app.add_middleware(MetricsMiddleware)
 
 # ---- Routers ----
 app.include_router(auth.router)
 app.include_router(user_input.router)
 app.include_router(chatbot.router)
 app.include_router(forecast.router)
-
-# ---- Seed dummy data ----
-@app.on_event("startup")
-def seed_dummy_data():
-    db = SessionLocal()
-    try:
-        if not db.query(models.Forecast).first():
-            print("🌱 Inserting dummy forecast data...")
-            dummy_daily = [
-                {"date": "2021-10-10", "rainfall": 14},
-                {"date": "2021-10-11", "rainfall": 7},
-                {"date": "2021-10-12", "rainfall": 20},
-                {"date": "2021-10-13", "rainfall": 12},
-                {"date": "2021-10-14", "rainfall": 9},
-                {"date": "2021-10-15", "rainfall": 18},
-                {"date": "2021-10-16", "rainfall": 6}
-            ]
-            dummy_monthly = [
-                {"date": "2021-10-10", "rainfall": 14},
-                {"date": "2021-11-11", "rainfall": 7},
-                {"date": "2021-12-12", "rainfall": 20}
-            ]
-            db.add_all([
-                models.Forecast(
-                    forecast_type="daily",
-                    forecast_data=json.dumps(dummy_daily),
-                    created_at=datetime.utcnow(),
-                ),
-                models.Forecast(
-                    forecast_type="monthly",
-                    forecast_data=json.dumps(dummy_monthly),
-                    created_at=datetime.utcnow(),
-                ),
-            ])
-            db.commit()
-            print("✅ Dummy forecast data inserted successfully.")
-        else:
-            print("✅ Forecast data already exists — skipping dummy insert.")
-    finally:
-        db.close()
+app.include_router(ingest.router)
+app.include_router(agent.router)
+app.include_router(locations.router)
+app.include_router(maintenance.router)
 
 @app.api_route("/status", methods=["GET", "HEAD"])
-def status():
+async def status():
+    if drain.draining:
+        # Shutting down: health checks should route new traffic to the other instance
+        return FastJSONResponse({"status": "draining", "message": "Shutting down."}, status_code=503)
     return {"status": "ok", "message": "Rainfall Project SAIL API is running."}
+
+
+# ---- Metrics ----
+def _cache_collector():
+    png = forecast.png_cache.stats()
+    return (
+        gauge_lines("forecast_cache_requests_total", "Latest-forecast cache lookups.",
+                    [({"result": "hit"}, forecast_cache.hits), ({"result": "miss"}, forecast_cache.misses)], kind="counter")
+        + gauge_lines("png_cache_requests_total", "Rendered PNG cache lookups.",
+                      [({"result": "hit"}, png["hits"]), ({"result": "miss"}, png["misses"])], kind="counter")
+        + gauge_lines("user_cache_requests_total", "Known-user cache lookups (user-existence checks).",
+                      [({"result": "hit"}, known_users.hits), ({"result": "miss"}, known_users.misses)], kind="counter")
+        + gauge_lines("password_hash_pending", "Password hashes queued or running.", [({}, passwords.pending())])
+        + gauge_lines("password_hash_rejected_total", "Password hashes refused with 503 (queue full).",
+                      [({}, passwords.rejected)], kind="counter")
+        + gauge_lines("plot_render_pending", "PNG renders queued or running.", [({}, plot_utils.pending())])
+        + gauge_lines("plot_render_rejected_total", "PNG renders refused with 503 (queue full).",
+                      [({}, plot_utils.rejected)], kind="counter")
+        + gauge_lines("retention_rows_removed_total", "Rows removed by the retention job.",
+                      [({"table": "forecasts"}, retention_job.forecasts_deleted),
+                       ({"table": "users_queries"}, retention_job.queries_archived)], kind="counter")
+        + gauge_lines("retention_running", "1 while a retention run is in progress.", [({}, int(retention_job.running))])
+        + gauge_lines("rate_limit_requests_total", "Rate-limited route requests by outcome.",
+                      [({"result": "allowed"}, rate_limiter.allowed)]
+                      + [({"result": "throttled", "rule": rule}, count) for rule, count in sorted(rate_limiter.throttled.items())],
+                      kind="counter")
+        + gauge_lines("admission_in_flight", "Requests holding an admission slot.", [({}, admission.in_flight)])
+        + gauge_lines("admission_queued", "Requests waiting for an admission slot.", [({}, admission.queued())])
+        + gauge_lines("admission_shed_total", "Requests refused with 503 by admission control.",
+                      [({}, admission.shed)], kind="counter")
+        + gauge_lines("chatbot_longpoll_waiters", "Requests waiting on /chatbot_response/wait.",
+                      [({}, response_notifier.waiting())])
+        + gauge_lines("invalidation_messages_total", "Cross-worker invalidation messages.",
+                      [({"direction": "published"}, invalidation.bus.published),
+                       ({"direction": "received"}, invalidation.bus.received),
+                       ({"direction": "dropped"}, invalidation.bus.dropped)], kind="counter")
+        + gauge_lines("invalidation_bus_connected", "1 while the invalidation bus listener is connected.",
+                      [({}, int(invalidation.bus.connected))])
+    )
+
+
+register_collector(_cache_collector)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus text exposition of request, DB, pool and cache metrics."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,103 @@
+# app/migrations/forecast_points.py
+# One-shot migration of legacy forecasts.forecast_data JSON blobs into forecast_points rows.
+# Idempotent: init_db() runs it on every boot; it is a no-op once no blob rows remain.
+# Manual run: python -m app.migrations.forecast_points
+
+import asyncio
+import json
+from datetime import datetime
+
+from sqlalchemy import inspect, select, update, insert
+
+BATCH_SIZE = 500
+
+
+def relax_forecast_data(conn):
+    """
+    Make forecasts.forecast_data nullable so new rows no longer carry a blob.
+    Must run before create_all() so SQLite's table rebuild sees no dependants.
+    """
+    from app import models
+
+    inspector = inspect(conn)
+    if "forecasts" not in inspector.get_table_names():
+        return
+    columns = {col["name"]: col for col in inspector.get_columns("forecasts")}
+    if "forecast_data" not in columns or columns["forecast_data"]["nullable"]:
+        return
+
+    print("⚠️ Making forecasts.forecast_data nullable...")
+    if conn.dialect.name == "sqlite":
+        # SQLite cannot drop NOT NULL in place: rebuild the table and copy rows over.
+        for index in inspector.get_indexes("forecasts"):
+            conn.exec_driver_sql(f'DROP INDEX IF EXISTS "{index["name"]}"')
+        conn.exec_driver_sql("ALTER TABLE forecasts RENAME TO forecasts_legacy")
+        models.Forecast.__table__.create(conn)
+        conn.exec_driver_sql(
+            "INSERT INTO forecasts (id, forecast_type, forecast_data, created_at) "
+            "SELECT id, forecast_type, forecast_data, created_at FROM forecasts_legacy"
+        )
+        conn.exec_driver_sql("DROP TABLE forecasts_legacy")
+    else:
+        conn.exec_driver_sql("ALTER TABLE forecasts ALTER COLUMN forecast_data DROP NOT NULL")
+
+
+def migrate_forecast_points(conn) -> int:
+    """
+    Copy every blob row into forecast_points, then clear its blob.
+    Entries with unparseable dates or rainfall are dropped (they used to render as "InvalidDate").
+    Returns the number of forecasts migrated.
+    """
+    from app import models
+
+    migrated = 0
+    while True:
+        rows = conn.execute(
+            select(models.Forecast.id, models.Forecast.forecast_data)
+            .where(models.Forecast.forecast_data.is_not(None))
+            .order_by(models.Forecast.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+
+        points = []
+        for forecast_id, blob in rows:
+            try:
+                data = json.loads(blob)
+            except (TypeError, ValueError):
+                data = []
+            for item in data if isinstance(data, list) else []:
+                try:
+                    points.append({
+                        "forecast_id": forecast_id,
+                        "date": datetime.strptime(item["date"], "%Y-%m-%d").date(),
+                        "rainfall": float(item["rainfall"]),
+                    })
+                except (KeyError, TypeError, ValueError):
+                    continue
+
+        if points:
+            conn.execute(insert(models.ForecastPoint), points)
+        conn.execute(
+            update(models.Forecast)
+            .where(models.Forecast.id.in_([forecast_id for forecast_id, _ in rows]))
+            .values(forecast_data=None)
+        )
+        migrated += len(rows)
+
+    if migrated:
+        print(f"✅ Migrated {migrated} forecast(s) into forecast_points.")
+    return migrated
+
+
+async def main():
+    from app.database import engine, init_db
+
+    # init_db() relaxes the column, creates forecast_points and runs the copy
+    await init_db()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,53 @@
+# app/migrations/forecast_summaries.py
+# Summaries for forecasts posted before forecast_summaries existed.
+# Only the newest forecast per (type, location) is summarized: it is the one GET /forecast_summary serves,
+# and every earlier forecast is its history. Idempotent: the lifespan handler runs it on every boot.
+# Manual run: python -m app.migrations.forecast_summaries
+
+import asyncio
+
+from sqlalchemy import select, func
+
+
+async def backfill_forecast_summaries() -> int:
+    """Insert the missing summaries; returns how many were added."""
+    from app import crud, models
+    from app.database import SessionLocal
+
+    ranked = select(
+        models.Forecast.id,
+        models.Forecast.forecast_type,
+        models.Forecast.location_id,
+        models.Forecast.created_at,
+        func.row_number().over(
+            partition_by=(models.Forecast.forecast_type, models.Forecast.location_id),
+            order_by=(models.Forecast.created_at.desc(), models.Forecast.id.desc()),
+        ).label("rank"),
+    ).subquery()
+    async with SessionLocal() as db:
+        latest = (await db.execute(
+            select(ranked.c.id, ranked.c.forecast_type, ranked.c.location_id, ranked.c.created_at)
+            .outerjoin(models.ForecastSummary, models.ForecastSummary.forecast_id == ranked.c.id)
+            .where(ranked.c.rank == 1, models.ForecastSummary.forecast_id.is_(None))
+        )).all()
+        for forecast_id, forecast_type, location_id, created_at in latest:
+            dates, values = await crud.forecast_series(db, forecast_id)
+            await crud.insert_forecast_summaries(
+                db, [(forecast_type, dates, values, location_id)], [(forecast_id, created_at)]
+            )
+        await db.commit()
+    if latest:
+        print(f"✅ Summarized {len(latest)} existing forecast(s).")
+    return len(latest)
+
+
+async def main():
+    from app.database import engine, init_db
+
+    await init_db()
+    await backfill_forecast_summaries()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
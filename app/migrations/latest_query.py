@@ -0,0 +1,26 @@
+# app/migrations/latest_query.py
+# Backfill users.latest_query_id for rows that predate the pointer.
+# init_db() runs it once, right after adding the column.
+
+from sqlalchemy import select, update
+
+
+def backfill_latest_query_ids(conn) -> int:
+    """Point every user at their newest query (by created_at, then id). Returns rows updated."""
+    from app import models
+
+    latest = (
+        select(models.UserQuery.id)
+        .where(models.UserQuery.user_id == models.User.id)
+        .order_by(models.UserQuery.created_at.desc(), models.UserQuery.id.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+    result = conn.execute(
+        update(models.User)
+        .where(models.User.latest_query_id.is_(None))
+        .values(latest_query_id=latest)
+    )
+    if result.rowcount:
+        print(f"✅ Backfilled latest_query_id for {result.rowcount} user(s).")
+    return result.rowcount
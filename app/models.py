@@ -1,7 +1,7 @@
 # app/models.py
-# SQLAlchemy ORM models: User, UserQuery, Forecast
+# SQLAlchemy ORM models: User, UserQuery, Location, Forecast, ForecastPoint, ForecastSummary
 
-from sqlalchemy import Column, Integer, String, DateTime, Text
+from sqlalchemy import Column, Integer, String, DateTime, Text, Date, Float, ForeignKey, Index
 from datetime import datetime
 from app.database import Base
 from sqlalchemy.orm import relationship
@@ -13,6 +13,8 @@ class User(Base):
     username = Column(String(64), unique=True, nullable=False, index=True)
     password = Column(String(256), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Denormalized pointer to the user's newest UserQuery; kept current by POST /user_input
+    latest_query_id = Column(Integer, nullable=True)
 
 
 class UserQuery(Base):
@@ -23,12 +25,83 @@ class UserQuery(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     response_text = Column(Text, nullable=True)
     response_time = Column(DateTime, nullable=True)
+    # Agent work queue lease (POST /agent/claim); stale once claimed_at is older than the lease
+    claimed_at = Column(DateTime, nullable=True)
+    claim_token = Column(String(64), nullable=True)
+
+
+# Per-user history scans newest first: WHERE user_id = ? ORDER BY created_at DESC, id DESC
+Index("ix_users_queries_user_created_id", UserQuery.user_id, UserQuery.created_at.desc(), UserQuery.id.desc())
+# Agent queue: only unanswered rows, oldest first
+Index(
+    "ix_users_queries_unanswered", UserQuery.created_at, UserQuery.id,
+    postgresql_where=UserQuery.response_text.is_(None),
+    sqlite_where=UserQuery.response_text.is_(None),
+)
+
+
+class Location(Base):
+    __tablename__ = "locations"
+    id = Column(String(64), primary_key=True)  # station/region code chosen by the agent
+    name = Column(String(128), nullable=True)
+    lat = Column(Float, nullable=True)
+    lon = Column(Float, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
 
 
 class Forecast(Base):
     __tablename__ = "forecasts"
+    __table_args__ = (
+        # latest-per-type lookups and keyset pages: WHERE forecast_type = ? ORDER BY created_at DESC, id DESC
+        Index("ix_forecasts_type_created_at_id", "forecast_type", "created_at", "id"),
+        # keyset pages across all types
+        Index("ix_forecasts_created_at_id", "created_at", "id"),
+        # latest per location and type
+        Index("ix_forecasts_location_type_created_at_id", "location_id", "forecast_type", "created_at", "id"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     forecast_type = Column(String(16), nullable=False, index=True)  # 'daily' or 'monthly'
-    # forecast_data stored as JSON string (text)
-    forecast_data = Column(Text, nullable=False)
+    # NULL for the global forecast served by /daily_forecast and /monthly_forecast
+    location_id = Column(String(64), ForeignKey("locations.id"), nullable=True)
+    # Legacy JSON blob; the series now lives in forecast_points (see app/migrations/forecast_points.py)
+    forecast_data = Column(Text, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+
+
+# The global endpoints only read location_id IS NULL rows; keep their lookups off per-location rows
+Index(
+    "ix_forecasts_global_type_created_at_id", Forecast.forecast_type, Forecast.created_at, Forecast.id,
+    postgresql_where=Forecast.location_id.is_(None),
+    sqlite_where=Forecast.location_id.is_(None),
+)
+
+
+class ForecastPoint(Base):
+    __tablename__ = "forecast_points"
+    __table_args__ = (
+        Index("ix_forecast_points_forecast_id_date", "forecast_id", "date"),
+    )
+    id = Column(Integer, primary_key=True)
+    forecast_id = Column(Integer, ForeignKey("forecasts.id", ondelete="CASCADE"), nullable=False)
+    date = Column(Date, nullable=False, index=True)
+    rainfall = Column(Float, nullable=False)
+
+
+class ForecastSummary(Base):
+    """Aggregates of one forecast (app/utils/forecast_stats.py), computed when it is posted."""
+    __tablename__ = "forecast_summaries"
+    __table_args__ = (
+        # GET /forecast_summary: newest summary per type and location in one index probe
+        Index("ix_forecast_summaries_type_location_created", "forecast_type", "location_id", "created_at", "forecast_id"),
+    )
+    forecast_id = Column(Integer, ForeignKey("forecasts.id", ondelete="CASCADE"), primary_key=True)
+    # Copied from the forecast so reads need no join
+    forecast_type = Column(String(16), nullable=False)
+    location_id = Column(String(64), nullable=True)
+    created_at = Column(DateTime, nullable=False)
+    total = Column(Float, nullable=True)
+    max_rainfall = Column(Float, nullable=True)
+    max_date = Column(Date, nullable=True)
+    # The rendered GET /forecast_summary body
+    body = Column(Text, nullable=False)
+
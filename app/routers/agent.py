@@ -0,0 +1,74 @@
+# app/routers/agent.py
+# Work queue for agent workers: claim unanswered user queries without duplicate work.
+
+import os
+import secrets
+from datetime import datetime, timedelta
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import select, update, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_db, IS_SQLITE
+from app import models
+
+router = APIRouter(prefix="/agent", tags=["agent"])
+
+# A claim not answered within this many seconds can be claimed by another worker
+CLAIM_LEASE_SECONDS = int(os.getenv("CLAIM_LEASE_SECONDS", "300"))
+
+
+@router.post("/claim")
+async def claim_queries(
+    limit: int = Query(10, ge=1, le=100),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Atomically claim up to `limit` unanswered queries, oldest first.
+    Returns a claim_token to send back with each POST /chatbot_response (with query_id);
+    answers for a claim that expired and was taken by another worker are rejected with 409.
+    Queries whose lease ran out are handed out again.
+    """
+    now = datetime.utcnow()
+    token = secrets.token_hex(16)
+
+    candidates = (
+        select(models.UserQuery.id)
+        .where(
+            models.UserQuery.response_text.is_(None),
+            or_(
+                models.UserQuery.claimed_at.is_(None),
+                models.UserQuery.claimed_at < now - timedelta(seconds=CLAIM_LEASE_SECONDS),
+            ),
+        )
+        .order_by(models.UserQuery.created_at, models.UserQuery.id)
+        .limit(limit)
+    )
+    if not IS_SQLITE:
+        # Concurrent claimers skip rows another transaction is claiming instead of waiting on them.
+        # SQLite serializes writers, so the single UPDATE below is already atomic there.
+        candidates = candidates.with_for_update(skip_locked=True)
+
+    rows = (await db.execute(
+        update(models.UserQuery)
+        .where(models.UserQuery.id.in_(candidates.scalar_subquery()))
+        .values(claimed_at=now, claim_token=token)
+        .returning(models.UserQuery.id, models.UserQuery.user_id, models.UserQuery.query_text, models.UserQuery.created_at)
+    )).all()
+    await db.commit()
+
+    rows.sort(key=lambda row: (row.created_at, row.id))
+    return {
+        "claim_token": token,
+        "claimed_at": now.isoformat(),
+        "lease_seconds": CLAIM_LEASE_SECONDS,
+        "items": [
+            {
+                "query_id": row.id,
+                "user_id": row.user_id,
+                "query_text": row.query_text,
+                "created_at": row.created_at.isoformat()
+            }
+            for row in rows
+        ]
+    }
@@ -1,44 +1,72 @@
 # app/routers/auth.py
-# Simple signup & login (no password hashing as requested).
+# Signup & login. Passwords are stored as scrypt hashes (see app/utils/passwords.py).
 
 from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
-from app.database import SessionLocal
+from sqlalchemy import select, insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_db
+from app.dependencies import remember_user
 from app import models, schemas
+from app.utils import passwords
+from datetime import datetime
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
 @router.post("/signup", status_code=201)
-def signup(payload: schemas.SignupIn, db: Session = Depends(get_db)):
+async def signup(payload: schemas.SignupIn, db: AsyncSession = Depends(get_db)):
     """
-    Register a new user (simple, no hashing).
+    Register a new user; the password is stored as a scrypt hash.
     Returns stored user id and username.
     """
-    if db.query(models.User).filter(models.User.email == payload.email).first():
-        raise HTTPException(status_code=400, detail="Email already exists")
+    password_hash = await passwords.hash_password_async(payload.password)
+
+    # The unique indexes on email/username do the duplicate check: one INSERT ... RETURNING
+    try:
+        user = (await db.execute(
+            insert(models.User)
+            .values(username=payload.username, password=password_hash, email=payload.email,
+                    created_at=datetime.utcnow())
+            .returning(models.User.id, models.User.created_at)
+        )).one()
+        await db.commit()
+    except IntegrityError as exc:
+        await db.rollback()
+        field = "Email" if "email" in str(exc.orig).lower() else "Username"
+        raise HTTPException(status_code=400, detail=f"{field} already exists")
 
-    user = models.User(username=payload.username, password=payload.password, email=payload.email)
-    db.add(user)
-    db.commit()
-    db.refresh(user)
-    return {"id": user.id, "email": user.email, "username": user.username, "created_at": user.created_at.isoformat()}
+    remember_user(user.id)
+    return {"id": user.id, "email": payload.email, "username": payload.username, "created_at": user.created_at.isoformat()}
 
 
 @router.post("/login")
-def login(payload: schemas.LoginIn, db: Session = Depends(get_db)):
+async def login(payload: schemas.LoginIn, db: AsyncSession = Depends(get_db)):
     """
     Simple login returning user id (frontend must store user_id).
+    Accounts created before hashing still hold plaintext; they are rehashed on their next login.
     """
-    user = db.query(models.User).filter(models.User.email == payload.email).first()
-    if not user or user.password != payload.password:
+    user = (await db.execute(
+        select(models.User.id, models.User.username, models.User.email, models.User.password)
+        .where(models.User.email == payload.email)
+    )).first()
+    # Don't hold a pooled connection while the hash runs (and possibly queues)
+    await db.rollback()
+    if not user:
+        # Same scrypt work as a wrong password, so timing does not reveal which emails are registered
+        await passwords.verify_password_async(payload.password, passwords.DUMMY_HASH)
+        raise HTTPException(status_code=401, detail="Invalid username or password")
+    if not await passwords.verify_password_async(payload.password, user.password):
         raise HTTPException(status_code=401, detail="Invalid username or password")
+
+    if passwords.needs_rehash(user.password):
+        new_hash = await passwords.hash_password_async(payload.password)
+        # Conditional on the old value: a concurrent password change wins
+        await db.execute(
+            update(models.User)
+            .where(models.User.id == user.id, models.User.password == user.password)
+            .values(password=new_hash)
+        )
+        await db.commit()
+
     return {"id": user.id, "username": user.username, "email": user.email}
@@ -1,48 +1,76 @@
 # app/routers/chatbot.py
 # Handles storing and retrieving chatbot responses linked to user queries.
 
-from fastapi import APIRouter, HTTPException, Depends, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, update, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
-from app.database import get_db
-from app import models, schemas
+from typing import Optional
+import time
+from app.database import get_db, SessionLocal
+from app.dependencies import ensure_user
+from app import models, schemas, crud, invalidation
+from app.utils import fast_json
+from app.utils.http_cache import make_etag, is_not_modified, set_cache_headers, not_modified
+from app.utils.notifier import response_notifier, RECHECK
+from app.utils.pagination import encode_cursor, decode_cursor
 
 router = APIRouter(prefix="", tags=["Chatbot"])
 
 
+async def _explain_missed_update(db: AsyncSession, payload: schemas.AgentResponseIn):
+    """Error path of agent_post_response: raise the 404/409 matching why nothing was updated."""
+    await ensure_user(db, payload.user_id)
+    if not payload.query_id:
+        raise HTTPException(status_code=404, detail="No queries found for that user")
+    if payload.claim_token:
+        exists = await db.scalar(
+            select(models.UserQuery.id).where(
+                models.UserQuery.id == payload.query_id, models.UserQuery.user_id == payload.user_id
+            )
+        )
+        if exists is not None:
+            raise HTTPException(status_code=409, detail="Claim expired and was taken by another worker")
+    raise HTTPException(status_code=404, detail="Query not found for given query_id and user")
+
+
 @router.post("/chatbot_response")
-def agent_post_response(payload: schemas.AgentResponseIn, db: Session = Depends(get_db)):
+async def agent_post_response(payload: schemas.AgentResponseIn, db: AsyncSession = Depends(get_db)):
     """
     Agent posts a textual response for a user's query.
     If query_id is provided, update that query; otherwise update the latest query for the user.
+    With claim_token (from POST /agent/claim), the answer is rejected with 409 if the claim was lost.
     """
-    # Ensure user exists
-    user = db.query(models.User).filter(models.User.id == payload.user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+    if payload.claim_token and not payload.query_id:
+        raise HTTPException(status_code=400, detail="claim_token requires query_id")
 
-    # Find target query to update
+    # One conditional UPDATE ... RETURNING finds and answers the target query
     if payload.query_id:
-        target = db.query(models.UserQuery).filter(
-            models.UserQuery.id == payload.query_id,
-            models.UserQuery.user_id == payload.user_id
-        ).first()
-        if not target:
-            raise HTTPException(status_code=404, detail="Query not found for given query_id and user")
+        conditions = [models.UserQuery.id == payload.query_id, models.UserQuery.user_id == payload.user_id]
+        if payload.claim_token:
+            conditions.append(models.UserQuery.claim_token == payload.claim_token)
     else:
-        target = db.query(models.UserQuery).filter(
-            models.UserQuery.user_id == payload.user_id
-        ).order_by(models.UserQuery.created_at.desc()).first()
-        if not target:
-            raise HTTPException(status_code=404, detail="No queries found for that user")
+        latest_id = select(models.User.latest_query_id).where(models.User.id == payload.user_id).scalar_subquery()
+        conditions = [models.UserQuery.id == latest_id]
 
-    # Update response fields
-    target.response_text = payload.response_text
-    target.response_time = datetime.utcnow()
+    target = (await db.execute(
+        update(models.UserQuery)
+        .where(*conditions)
+        .values(response_text=payload.response_text, response_time=datetime.utcnow())
+        .returning(
+            models.UserQuery.id, models.UserQuery.query_text, models.UserQuery.created_at,
+            models.UserQuery.response_text, models.UserQuery.response_time,
+        )
+        .execution_options(synchronize_session=False)
+    )).first()
+    if target is None:
+        await _explain_missed_update(db, payload)
+    await db.commit()
 
-    db.add(target)
-    db.commit()
-    db.refresh(target)
+    # Wake long-polling clients of this user, here and in the other workers
+    response_notifier.notify(payload.user_id, crud.response_body(target))
+    invalidation.response_posted(payload.user_id, target.id)
 
     return {
         "status": "success",
@@ -52,32 +80,146 @@ def agent_post_response(payload: schemas.AgentResponseIn, db: Session = Depends(
 
 
 @router.get("/chatbot_response")
-def get_latest_response(user_id: int = Query(...), db: Session = Depends(get_db)):
+async def get_latest_response(
+    request: Request,
+    response: Response,
+    user_id: int = Query(...),
+    db: AsyncSession = Depends(get_db),
+):
     """
     Frontend fetches the latest query and its response_text for a given user_id.
     Returns only text fields in JSON format.
+    ETag/Last-Modified follow the query id and response_time, so polls that see
+    no new query or answer get 304.
     """
-    # Ensure user exists
-    user = db.query(models.User).filter(models.User.id == user_id).first()
-    if not user:
+    # Ensure user exists and fetch the latest query in the same lookup
+    latest = await crud.user_latest_query(db, user_id)
+    if latest is None:
         raise HTTPException(status_code=404, detail="User not found")
 
-    latest = db.query(models.UserQuery).filter(
-        models.UserQuery.user_id == user_id
-    ).order_by(models.UserQuery.created_at.desc()).first()
+    if latest.id is None:
+        return dict(crud.EMPTY_RESPONSE)
 
-    if not latest:
-        return {
-            "query_id": None,
-            "query_text": None,
-            "response_text": None,
-            "response_time": None
-        }
+    # Changes when a newer query appears or the agent answers this one
+    etag = make_etag("query", latest.id, latest.response_time or "pending")
+    last_modified = latest.response_time or latest.created_at
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(etag, last_modified)
+    set_cache_headers(response, etag, last_modified)
 
-    return {
-        "query_id": latest.id,
-        "query_text": latest.query_text,
-        "response_text": latest.response_text,
-        "response_time": latest.response_time.isoformat() if latest.response_time else None,
-        "created_at": latest.created_at.isoformat()
-    }
+    return crud.response_body(latest)
+
+
+async def _current_state(db: AsyncSession, user_id: int, query_id: Optional[int]):
+    """Body for the awaited query (or the user's latest one); 404 if the user is unknown."""
+    if query_id is None:
+        latest = await crud.user_latest_query(db, user_id)
+        if latest is None:
+            raise HTTPException(status_code=404, detail="User not found")
+        return crud.response_body(latest) if latest.id is not None else dict(crud.EMPTY_RESPONSE)
+
+    await ensure_user(db, user_id)
+
+    target = await db.scalar(
+        select(models.UserQuery).where(models.UserQuery.user_id == user_id, models.UserQuery.id == query_id)
+    )
+    if not target:
+        raise HTTPException(status_code=404, detail="Query not found for given query_id and user")
+    return crud.response_body(target)
+
+
+@router.get("/chatbot_response/wait")
+async def wait_for_response(
+    user_id: int = Query(...),
+    query_id: Optional[int] = Query(None),
+    timeout: float = Query(25.0, ge=0, le=60),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Long-poll replacement for polling GET /chatbot_response.
+    Returns as soon as the query (query_id, or the user's latest) has a response_text,
+    or after `timeout` seconds with the current, still-pending state.
+    The worker holds no DB connection or thread while waiting.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        # Register first so a response committed during the DB check still wakes us
+        waiter = response_notifier.register(user_id)
+        try:
+            state = await _current_state(db, user_id, query_id)
+            # Give the connection back to the pool for the duration of the wait
+            await db.rollback()
+            if state["response_text"] is not None:
+                return state
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return state
+            payload = await response_notifier.wait(waiter, remaining)
+        finally:
+            response_notifier.unregister(user_id, waiter)
+
+        if payload is None:
+            return state
+        if payload is RECHECK:
+            continue  # answered in another worker: the next pass reads it from the DB
+        # Without query_id we wait on the latest query as read above, like GET /chatbot_response
+        if payload["query_id"] == (query_id if query_id is not None else state.get("query_id")):
+            return payload
+        # A different query of this user was answered: re-read and keep waiting for ours
+
+
+async def _stream_history(user_id: int, before, limit: int):
+    """
+    Yield one JSON document, {"user_id", "items": [...], "next_before"}, row by row.
+    Rows come from a server-side cursor, so memory stays flat whatever the page size.
+    """
+    stmt = (
+        select(
+            models.UserQuery.id, models.UserQuery.query_text, models.UserQuery.created_at,
+            models.UserQuery.response_text, models.UserQuery.response_time,
+        )
+        .where(models.UserQuery.user_id == user_id)
+    )
+    if before is not None:
+        stmt = stmt.where(tuple_(models.UserQuery.created_at, models.UserQuery.id) < tuple_(*before))
+    # One extra row tells whether there is an older page
+    stmt = stmt.order_by(models.UserQuery.created_at.desc(), models.UserQuery.id.desc()).limit(limit + 1)
+
+    yield f'{{"user_id": {user_id}, "items": ['
+    last, count, more = None, 0, False
+    # The request's session is released before streaming starts: use our own.
+    async with SessionLocal() as db:
+        result = await db.stream(stmt)
+        async for row in result:
+            if count == limit:
+                more = True
+                break
+            yield ("," if count else "") + fast_json.dumps_str(crud.response_body(row))
+            last, count = row, count + 1
+        await result.close()
+
+    next_before = encode_cursor(last.created_at, last.id) if more else None
+    yield f'], "next_before": {fast_json.dumps_str(next_before)}}}'
+
+
+@router.get("/chatbot_history")
+async def get_chatbot_history(
+    user_id: int = Query(...),
+    before: Optional[str] = Query(None),
+    limit: int = Query(50, ge=1, le=500),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    A user's queries and responses, newest first, streamed as JSON.
+    - before: the previous page's "next_before" value (omit for the newest page).
+    Keyset pagination on (created_at, id) over ix_users_queries_user_created_id:
+    a deep page costs the same as the first.
+    """
+    cursor = decode_cursor(before) if before is not None else None
+
+    await ensure_user(db, user_id)
+    # Give the connection back before streaming; the generator checks out its own
+    await db.rollback()
+
+    return StreamingResponse(_stream_history(user_id, cursor, limit), media_type="application/json")
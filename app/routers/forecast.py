@@ -1,218 +1,474 @@
 # app/routers/forecast.py
-# Agent posts forecast JSON lists (overwrite). Frontend GET returns only a PNG plot (image/png).
-
-from fastapi import APIRouter, HTTPException, Depends, Query, Response
-from sqlalchemy.orm import Session
-from datetime import datetime
-import json
-from app.database import SessionLocal
-from app import models, schemas
-from app.utils.plot_utils import plot_dates_values_png_bytes
+# Agent posts forecasts (JSON rows, JSON columns or packed float32). Frontend GETs them as JSON
+# (rows or columns, negotiated via Accept), packed float32, or a PNG plot (image/png).
+
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime, date as date_type
+from typing import Optional
+import os
+from app.database import get_db, SessionLocal
+from app.dependencies import existing_user_id
+from app import models, schemas, crud, invalidation
+from app.utils import columnar, fast_json
+from app.utils.plot_utils import render_png
+from app.utils.lru_cache import LRUCache
+from app.utils.forecast_cache import forecast_cache
+from app.utils.http_cache import make_etag, is_not_modified, set_cache_headers, not_modified, preferred_media_type
+from app.utils.pagination import encode_cursor, decode_cursor, naive_utc
 
 router = APIRouter(prefix="", tags=["forecast"])
 
-
-def get_db():
-    db = SessionLocal()
+# Rendered charts keyed by (forecast_id, width, height, dpi); a forecast never changes once posted.
+png_cache = LRUCache(maxsize=int(os.getenv("PNG_CACHE_SIZE", "64")))
+
+# GET representations, in order of preference when the client accepts anything
+FORECAST_MEDIA_TYPES = ("application/json", columnar.COLUMNS_MEDIA_TYPE, columnar.BINARY_MEDIA_TYPE)
+
+# The POST bodies are parsed by hand (three content types); describe them for /docs
+FORECAST_UPLOAD_OPENAPI = {
+    "requestBody": {
+        "required": False,
+        "content": {
+            "application/json": {"schema": {"oneOf": [
+                {"type": "array", "items": {"type": "object", "properties": {
+                    "date": {"type": "string", "format": "date"}, "rainfall": {"type": "number"}}}},
+                {"type": "object", "properties": {
+                    "dates": {"type": "array", "items": {"type": "string", "format": "date"}},
+                    "values": {"type": "array", "items": {"type": "number"}}}},
+            ]}},
+            columnar.BINARY_MEDIA_TYPE: {"schema": {
+                "type": "string", "format": "binary",
+                "description": "Little-endian float32 values; dates from the start/step query parameters."}},
+        },
+    }
+}
+
+DUMMY_DAILY = [
+    {"date": "2021-10-10", "rainfall": 14},
+    {"date": "2021-10-11", "rainfall": 7},
+    {"date": "2021-10-12", "rainfall": 20},
+    {"date": "2021-10-13", "rainfall": 0},
+    {"date": "2021-10-14", "rainfall": 11},
+    {"date": "2021-10-15", "rainfall": 5},
+    {"date": "2021-10-16", "rainfall": 17}
+]
+DUMMY_MONTHLY = [
+    {"date": "2021-10-10", "rainfall": 14},
+    {"date": "2021-11-11", "rainfall": 7},
+    {"date": "2021-12-12", "rainfall": 20}
+]
+
+
+async def read_forecast_upload(request: Request, forecast_type: str, start: Optional[date_type], step: int):
+    """
+    Parse a POST body into sorted (datetime64[D] dates, float values):
+    - application/json list of {"date", "rainfall"} (original format, validated per item),
+    - application/json {"dates": [...], "values": [...]} (validated as whole arrays),
+    - application/octet-stream packed float32, dated from ?start= every ?step= days/months.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    body = await request.body()
     try:
-        yield db
-    finally:
-        db.close()
+        if content_type == columnar.BINARY_MEDIA_TYPE:
+            if start is None:
+                raise columnar.ColumnarError("start is required for application/octet-stream uploads")
+            return columnar.from_float32(body, start, step, columnar.STEP_UNITS[forecast_type])
+
+        try:
+            payload = fast_json.loads(body) if body.strip() else []
+        except ValueError:
+            raise columnar.ColumnarError("Body is not valid JSON")
+        if isinstance(payload, dict):
+            if "dates" not in payload or "values" not in payload:
+                raise columnar.ColumnarError("Columnar body needs 'dates' and 'values' arrays")
+            return crud.sort_series(*columnar.from_json_columns(payload["dates"], payload["values"]))
+        try:
+            items = schemas.ForecastList.model_validate(payload).root
+        except ValidationError as exc:
+            raise RequestValidationError(exc.errors(include_url=False))
+        return crud.item_columns(items)
+    except columnar.ColumnarError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+
+
+async def _store_forecast(db: AsyncSession, forecast_type: str, dates, values):
+    """Insert one forecast series, commit, write it through to the cache."""
+    [(forecast_id, created_at)] = await crud.insert_forecasts(db, [(forecast_type, dates, values, None)])
+    await db.commit()
+
+    # ✅ Write-through: readers get this forecast without touching the DB
+    crud.cache_forecast(forecast_type, forecast_id, created_at, dates, values)
+    invalidation.forecast_stored(forecast_type, forecast_id)
+
+    return {
+        "status": "success",
+        "records": len(values),
+        "forecast_id": forecast_id,
+        "created_at": created_at.isoformat()
+    }
 
 
-@router.post("/daily_forecast")
-def post_daily_forecast(items: schemas.ForecastList, db: Session = Depends(get_db)):
+@router.post("/daily_forecast", openapi_extra=FORECAST_UPLOAD_OPENAPI)
+async def post_daily_forecast(
+    request: Request,
+    start: Optional[date_type] = Query(None, description="First date (application/octet-stream uploads)"),
+    step: int = Query(1, ge=1, le=columnar.MAX_STEPS["D"], description="Days between values (application/octet-stream uploads)"),
+    db: AsyncSession = Depends(get_db),
+):
     """
     Agent posts a daily forecast list (expected 7 items).
-    The endpoint appends a new Forecast row (forecast_type='daily') with forecast_data stored as JSON text.
+    The endpoint appends a new Forecast row (forecast_type='daily') with one forecast_points row per item.
     Agent is unauthenticated and responsible for providing the correct 7-day forecast values.
+    Accepts JSON rows, JSON columns ({"dates", "values"}) or packed float32 with start/step.
     Uses dummy data if no items are provided.
     """
-    items_list = items.root
+    dates, values = await read_forecast_upload(request, "daily", start, step)
 
     # ✅ Use dummy data if nothing or invalid data is provided
-    if not items_list or not isinstance(items_list, list) or len(items_list) == 0:
-        items_list = [
-            {"date": "2021-10-10", "rainfall": 14},
-            {"date": "2021-10-11", "rainfall": 7},
-            {"date": "2021-10-12", "rainfall": 20},
-            {"date": "2021-10-13", "rainfall": 0},
-            {"date": "2021-10-14", "rainfall": 11},
-            {"date": "2021-10-15", "rainfall": 5},
-            {"date": "2021-10-16", "rainfall": 17}
-        ]
+    if len(values) == 0:
+        dates, values = crud.item_columns([schemas.ForecastItem(**it) for it in DUMMY_DAILY])
 
     # Optional validation: ensure approximately 7 entries (agent responsibility)
-    if len(items_list) != 7:
+    if len(values) != 7:
         # Do not reject automatically — warn but accept.
         # raise HTTPException(status_code=400, detail="Expected 7 daily forecast items")
         pass
 
-    # ✅ Safely handle dict or Pydantic objects
-    payload_text = json.dumps([it if isinstance(it, dict) else it.dict() for it in items_list])
-
-    row = models.Forecast(
-        forecast_type="daily",
-        forecast_data=payload_text,
-        created_at=datetime.utcnow()
-    )
-    db.add(row)
-    db.commit()
-    db.refresh(row)
-
-    return {
-        "status": "success",
-        "records": len(items_list),
-        "forecast_id": row.id,
-        "created_at": row.created_at.isoformat()
-    }
-
-
-@router.get("/daily_forecast")
-def get_daily_forecast(user_id: int = Query(...), db: Session = Depends(get_db)):
+    return await _store_forecast(db, "daily", dates, values)
+
+
+def _forecast_representation(forecast_type: str, media_type: str, entry, etag: str, created_at):
+    """Response for one negotiated representation of a cached forecast entry."""
+    label_key = crud.FORECAST_LABELS[forecast_type]
+    if media_type == columnar.COLUMNS_MEDIA_TYPE:
+        response = fast_json.FastJSONResponse(
+            crud.forecast_columns_body(entry["dates"], entry["values"], label_key), media_type=media_type
+        )
+    elif media_type == columnar.BINARY_MEDIA_TYPE:
+        unit = columnar.STEP_UNITS[forecast_type]
+        step = columnar.regular_step(entry["dates"], unit)
+        if step is None:
+            raise HTTPException(
+                status_code=406,
+                detail="Forecast dates are not evenly spaced; request application/json instead"
+            )
+        response = Response(content=columnar.to_float32(entry["values"]), media_type=media_type, headers={
+            "X-Forecast-Start": columnar.iso_dates(entry["dates"][:1])[0],
+            "X-Forecast-Step": str(step),
+            "X-Forecast-Step-Unit": "day" if unit == "D" else "month",
+            "X-Forecast-Count": str(len(entry["values"])),
+        })
+    else:
+        # Rendered once when cached; served without re-encoding
+        response = Response(content=entry["body"], media_type="application/json")
+    set_cache_headers(response, etag, created_at)
+    response.headers["Vary"] = "Accept"
+    return response
+
+
+async def _latest_forecast(request: Request, db: AsyncSession, forecast_type: str):
+    """Latest forecast of a type in the representation the Accept header asks for."""
+    media_type = preferred_media_type(request, FORECAST_MEDIA_TYPES)
+    if media_type is None:
+        raise HTTPException(status_code=406, detail=f"Supported types: {', '.join(FORECAST_MEDIA_TYPES)}")
+
+    # ✅ Serve from the in-process cache when the latest forecast is already formatted
+    entry = forecast_cache.get(forecast_type)
+    if entry is not None:
+        forecast_id, created_at = entry["forecast_id"], entry["created_at"]
+    else:
+        # ✅ Get the most recent forecast of this type
+        row = await crud.latest_forecast(db, forecast_type)
+        if not row:
+            raise HTTPException(status_code=404, detail=f"No {forecast_type} forecast available")
+        forecast_id, created_at = row.id, row.created_at
+
+    # ✅ Conditional GET: answer 304 before loading anything (JSON keeps its original ETag)
+    variant = {columnar.COLUMNS_MEDIA_TYPE: "columns", columnar.BINARY_MEDIA_TYPE: "f32"}.get(media_type)
+    etag = make_etag(forecast_type, *([variant] if variant else []), forecast_id, created_at)
+    if is_not_modified(request, etag, created_at):
+        response = not_modified(etag, created_at)
+        response.headers["Vary"] = "Accept"
+        return response
+
+    if entry is None:
+        # ✅ Fetch only the date/rainfall columns of its points
+        dates, values = await crud.forecast_series(db, forecast_id)
+        if len(values) == 0:
+            raise HTTPException(status_code=500, detail="Stored forecast data is corrupted or invalid")
+        body = crud.cache_forecast(forecast_type, forecast_id, created_at, dates, values)
+        entry = {"body": body, "dates": dates, "values": values}
+
+    return _forecast_representation(forecast_type, media_type, entry, etag, created_at)
+
+
+@router.get("/daily_forecast", responses={200: {"content": {t: {} for t in FORECAST_MEDIA_TYPES}}})
+async def get_daily_forecast(
+    request: Request,
+    user_id: int = Depends(existing_user_id),
+    db: AsyncSession = Depends(get_db),
+):
     """
     Return the latest daily forecast as JSON.
     - Validates user existence.
     - Retrieves the most recent 'daily' forecast.
     - Converts dates to day names (Sun–Sat).
+    - Accept: application/vnd.sail.forecast-columns+json for parallel arrays, or
+      application/octet-stream for float32 values (start/step in X-Forecast-* headers).
+    - Sends ETag/Last-Modified; matching conditional requests get 304.
     """
-    # ✅ Validate user exists
-    user = db.query(models.User).filter(models.User.id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    # ✅ Get the most recent daily forecast
-    row = (
-        db.query(models.Forecast)
-        .filter(models.Forecast.forecast_type == "daily")
-        .order_by(models.Forecast.created_at.desc())
-        .first()
-    )
-    if not row:
-        raise HTTPException(status_code=404, detail="No daily forecast available")
-
-    # ✅ Parse stored forecast data
-    try:
-        data = json.loads(row.forecast_data)
-        if not isinstance(data, list) or len(data) == 0:
-            raise ValueError("Forecast data is empty or invalid")
-    except Exception:
-        raise HTTPException(status_code=500, detail="Stored forecast data is corrupted or invalid")
-
-    # ✅ Convert dates → day names (Sun–Sat)
-    formatted_data = []
-    for item in data:
-        date_str = item.get("date")
-        rainfall = item.get("rainfall")
-
-        try:
-            date_obj = datetime.strptime(date_str, "%Y-%m-%d")
-            day_name = date_obj.strftime("%a")  # e.g. "Sun", "Mon", "Tue"
-        except Exception:
-            day_name = "InvalidDate"
-
-        formatted_data.append({
-            "day": day_name,
-            "date": date_str,
-            "rainfall": rainfall
-        })
+    return await _latest_forecast(request, db, "daily")
 
-    return {
-        "data": formatted_data
-    }
 
-
-@router.post("/monthly_forecast")
-def post_monthly_forecast(items: schemas.ForecastList, db: Session = Depends(get_db)):
+@router.post("/monthly_forecast", openapi_extra=FORECAST_UPLOAD_OPENAPI)
+async def post_monthly_forecast(
+    request: Request,
+    start: Optional[date_type] = Query(None, description="First date (application/octet-stream uploads)"),
+    step: int = Query(1, ge=1, le=columnar.MAX_STEPS["M"], description="Months between values (application/octet-stream uploads)"),
+    db: AsyncSession = Depends(get_db),
+):
     """
     Agent posts a monthly forecast list (expected 3 items for next 3 months).
-    Appends a new Forecast row with forecast_type='monthly'.
+    Appends a new Forecast row with forecast_type='monthly' and its forecast_points rows.
+    Accepts JSON rows, JSON columns ({"dates", "values"}) or packed float32 with start/step.
     Uses dummy data if no items are posted (for testing/demo purposes).
     """
-    items_list = items.root
+    dates, values = await read_forecast_upload(request, "monthly", start, step)
 
     # ✅ Use dummy data if nothing or invalid data is provided
-    if not items_list or not isinstance(items_list, list) or len(items_list) == 0:
-        items_list = [
-            {"date": "2021-10-10", "rainfall": 14},
-            {"date": "2021-11-11", "rainfall": 7},
-            {"date": "2021-12-12", "rainfall": 20}
-        ]
+    if len(values) == 0:
+        dates, values = crud.item_columns([schemas.ForecastItem(**it) for it in DUMMY_MONTHLY])
 
     # Optional validation: ensure approximately 3 entries (agent responsibility)
-    if len(items_list) != 3:
+    if len(values) != 3:
         # Do not reject automatically — warn but accept.
         # raise HTTPException(status_code=400, detail="Expected 3 monthly forecast items")
         pass
 
-    # ✅ Safely serialize whether dicts or Pydantic models
-    payload_text = json.dumps([it if isinstance(it, dict) else it.dict() for it in items_list])
-
-    row = models.Forecast(
-        forecast_type="monthly",
-        forecast_data=payload_text,
-        created_at=datetime.utcnow()
-    )
-    db.add(row)
-    db.commit()
-    db.refresh(row)
+    return await _store_forecast(db, "monthly", dates, values)
 
-    return {
-        "status": "success",
-        "records": len(items_list),
-        "forecast_id": row.id,
-        "created_at": row.created_at.isoformat()
-    }
 
-@router.get("/monthly_forecast")
-def get_monthly_forecast(user_id: int = Query(...), db: Session = Depends(get_db)):
+@router.get("/monthly_forecast", responses={200: {"content": {t: {} for t in FORECAST_MEDIA_TYPES}}})
+async def get_monthly_forecast(
+    request: Request,
+    user_id: int = Depends(existing_user_id),
+    db: AsyncSession = Depends(get_db),
+):
     """
     Return the latest monthly forecast as JSON.
     - Validates user_id exists.
     - Retrieves the most recent monthly forecast.
     - Converts dates to month names (e.g. Oct, Nov, Dec).
+    - Accept: application/vnd.sail.forecast-columns+json for parallel arrays, or
+      application/octet-stream for float32 values (start/step in X-Forecast-* headers).
+    - Sends ETag/Last-Modified; matching conditional requests get 304.
+    """
+    return await _latest_forecast(request, db, "monthly")
+
+
+async def _forecast_png(
+    request: Request,
+    db: AsyncSession,
+    forecast_type: str,
+    title: str,
+    width: float,
+    height: float,
+    dpi: int,
+):
+    """Serve the latest forecast of a type as PNG, from png_cache when possible."""
+    cached = forecast_cache.get(forecast_type)
+    if cached is not None:
+        forecast_id, created_at = cached["forecast_id"], cached["created_at"]
+    else:
+        row = await crud.latest_forecast(db, forecast_type)
+        if not row:
+            raise HTTPException(status_code=404, detail=f"No {forecast_type} forecast available")
+        forecast_id, created_at = row.id, row.created_at
+
+    etag = make_etag(forecast_type, "png", forecast_id, width, height, dpi)
+    if is_not_modified(request, etag, created_at):
+        return not_modified(etag, created_at)
+
+    key = (forecast_id, width, height, dpi)
+    png = png_cache.get(key)
+    if png is None:
+        if cached is not None:
+            dates, values = cached["dates"], cached["values"]
+        else:
+            dates, values = await crud.forecast_series(db, forecast_id)
+        if len(values) == 0:
+            raise HTTPException(status_code=500, detail="Stored forecast data is corrupted or invalid")
+        png = await render_png(columnar.iso_dates(dates), values.tolist(), title, width, height, dpi)
+        png_cache.set(key, png)
+
+    response = Response(content=png, media_type="image/png")
+    set_cache_headers(response, etag, created_at)
+    return response
+
+
+@router.get("/daily_forecast.png")
+async def get_daily_forecast_png(
+    request: Request,
+    user_id: int = Depends(existing_user_id),
+    width: float = Query(10, ge=2, le=20),
+    height: float = Query(4.5, ge=2, le=20),
+    dpi: int = Query(150, ge=50, le=300),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Latest daily forecast as a PNG line chart (image/png).
+    width/height are in inches. Repeated views are served from memory.
+    """
+    return await _forecast_png(request, db, "daily", "Daily Rainfall Forecast", width, height, dpi)
+
+
+@router.get("/monthly_forecast.png")
+async def get_monthly_forecast_png(
+    request: Request,
+    user_id: int = Depends(existing_user_id),
+    width: float = Query(10, ge=2, le=20),
+    height: float = Query(4.5, ge=2, le=20),
+    dpi: int = Query(150, ge=50, le=300),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Latest monthly forecast as a PNG line chart (image/png).
+    width/height are in inches. Repeated views are served from memory.
+    """
+    return await _forecast_png(request, db, "monthly", "Monthly Rainfall Forecast", width, height, dpi)
+
+
+async def _stream_forecast_page(page):
     """
-    # ✅ Validate user exists
-    user = db.query(models.User).filter(models.User.id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    # ✅ Get the most recent monthly forecast
-    row = (
-        db.query(models.Forecast)
-        .filter(models.Forecast.forecast_type == "monthly")
-        .order_by(models.Forecast.created_at.desc())
-        .first()
+    Yield one NDJSON line per forecast of the page, in page order.
+    Points are streamed from a server-side cursor and grouped on the fly,
+    so only one forecast's points are held in memory at a time.
+    """
+    pending = iter(page)
+    current = next(pending, None)
+    data = []
+
+    def line(row, points):
+        return fast_json.dumps_str({
+            "forecast_id": row.id,
+            "forecast_type": row.forecast_type,
+            "created_at": row.created_at.isoformat(),
+            "data": points
+        }) + "\n"
+
+    # The request's session may already be closed once the body is streamed: use our own.
+    async with SessionLocal() as db:
+        result = await db.stream(
+            select(models.ForecastPoint.forecast_id, models.ForecastPoint.date, models.ForecastPoint.rainfall)
+            .join(models.Forecast, models.Forecast.id == models.ForecastPoint.forecast_id)
+            .where(models.ForecastPoint.forecast_id.in_([row.id for row in page]))
+            .order_by(models.Forecast.created_at.desc(), models.Forecast.id.desc(), models.ForecastPoint.date)
+        )
+        async for forecast_id, day, rainfall in result:
+            while current is not None and current.id != forecast_id:
+                yield line(current, data)
+                current, data = next(pending, None), []
+            data.append({"date": day.isoformat(), "rainfall": rainfall})
+
+    while current is not None:
+        yield line(current, data)
+        current, data = next(pending, None), []
+
+
+@router.get("/forecasts")
+async def list_forecasts(
+    forecast_type: Optional[str] = Query(None, alias="type", pattern="^(daily|monthly)$"),
+    since: Optional[datetime] = Query(None),
+    until: Optional[datetime] = Query(None),
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(50, ge=1, le=500),
+    location_id: Optional[str] = Query(None, alias="location"),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Forecast history, newest first, as NDJSON (one forecast per line).
+    - type: 'daily' or 'monthly' (default: both).
+    - location: a location id (default: the global forecasts).
+    - since/until: created_at range, inclusive/exclusive.
+    - cursor: value of the previous page's X-Next-Cursor header.
+    Keyset pagination on (created_at, id): a deep page costs the same as the first.
+    """
+    stmt = select(models.Forecast.id, models.Forecast.forecast_type, models.Forecast.created_at).where(
+        models.Forecast.location_id == location_id if location_id is not None else models.Forecast.location_id.is_(None)
     )
-    if not row:
-        raise HTTPException(status_code=404, detail="No monthly forecast available")
+    if forecast_type is not None:
+        stmt = stmt.where(models.Forecast.forecast_type == forecast_type)
+    if since is not None:
+        stmt = stmt.where(models.Forecast.created_at >= naive_utc(since))
+    if until is not None:
+        stmt = stmt.where(models.Forecast.created_at < naive_utc(until))
+    if cursor is not None:
+        created_at, row_id = decode_cursor(cursor)
+        stmt = stmt.where(tuple_(models.Forecast.created_at, models.Forecast.id) < tuple_(created_at, row_id))
+
+    # Fetch one extra row to learn whether another page exists
+    rows = (await db.execute(
+        stmt.order_by(models.Forecast.created_at.desc(), models.Forecast.id.desc()).limit(limit + 1)
+    )).all()
+    page = rows[:limit]
+
+    headers = {}
+    if len(rows) > limit:
+        headers["X-Next-Cursor"] = encode_cursor(page[-1].created_at, page[-1].id)
+
+    # Release this session's connection now: the stream checks out its own, and holding
+    # both per request can exhaust the pool under concurrency.
+    await db.rollback()
+    return StreamingResponse(_stream_forecast_page(page), media_type="application/x-ndjson", headers=headers)
+
+
+@router.get("/forecast_summary")
+async def get_forecast_summary(
+    request: Request,
+    forecast_type: str = Query("daily", alias="type", pattern="^(daily|monthly)$"),
+    location_id: Optional[str] = Query(None, alias="location", description="Location id (omit for the global forecast)"),
+    user_id: int = Depends(existing_user_id),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Aggregates of the latest forecast of a type: total, mean, wettest/driest point, rainy points,
+    weekly and monthly totals, and each month's mean against the history of earlier forecasts.
+    Computed when the forecast was posted; this is one indexed read of the stored body.
+    """
+    row = await crud.latest_forecast_summary(db, forecast_type, location_id)
+    if row is None:
+        raise HTTPException(status_code=404, detail=f"No {forecast_type} forecast summary available")
+    forecast_id, created_at, body = row
 
-    # ✅ Parse stored JSON
-    try:
-        data = json.loads(row.forecast_data)
-        if not isinstance(data, list) or len(data) == 0:
-            raise ValueError("Forecast data is empty or invalid")
-    except Exception:
-        raise HTTPException(status_code=500, detail="Stored forecast data is corrupted or invalid")
-
-    # ✅ Convert date → month abbreviation (Jan–Dec)
-    formatted_data = []
-    for item in data:
-        date_str = item.get("date")
-        rainfall = item.get("rainfall")
+    etag = make_etag(forecast_type, "summary", location_id or "", forecast_id, created_at)
+    if is_not_modified(request, etag, created_at):
+        return not_modified(etag, created_at)
+    response = Response(content=body, media_type="application/json")
+    set_cache_headers(response, etag, created_at)
+    return response
 
-        try:
-            date_obj = datetime.strptime(date_str, "%Y-%m-%d")
-            month_name = date_obj.strftime("%b")  # e.g. "Oct", "Nov", "Dec"
-        except Exception:
-            month_name = "InvalidDate"
-
-        formatted_data.append({
-            "month": month_name,
-            "date": date_str,
-            "rainfall": rainfall
-        })
 
-    return {
-        "data": formatted_data
-    }
\ No newline at end of file
+@router.get("/forecast_cache/stats")
+async def get_forecast_cache_stats():
+    """
+    Hit/miss counters and current entries of the latest-forecast cache (and the PNG cache).
+    """
+    return {**forecast_cache.stats(), "png": png_cache.stats()}
+
+
+@router.post("/forecast_cache/invalidate")
+async def invalidate_forecast_cache(forecast_type: Optional[str] = Query(None)):
+    """
+    Drop cached forecasts so the next GET reloads from the DB, in every worker
+    (e.g. after writing forecasts to the DB by hand).
+    """
+    if forecast_type is not None and forecast_type not in ("daily", "monthly"):
+        raise HTTPException(status_code=400, detail="forecast_type must be 'daily' or 'monthly'")
+    forecast_cache.invalidate(forecast_type)
+    invalidation.forecasts_invalidated(forecast_type)
+    return {"status": "success", "invalidated": forecast_type or "all"}
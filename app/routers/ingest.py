@@ -0,0 +1,161 @@
+# app/routers/ingest.py
+# Batch endpoint for the agent: many forecasts and chatbot responses in one request and one transaction.
+
+from fastapi import APIRouter, Depends
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime
+from types import SimpleNamespace
+from app.database import get_db
+from app import models, schemas, crud, dependencies, invalidation
+from app.utils import columnar
+from app.utils.notifier import response_notifier
+
+router = APIRouter(prefix="", tags=["ingest"])
+
+
+async def _load_targets(db: AsyncSession, responses):
+    """
+    Resolve every chatbot response to its target query with at most three queries
+    (uncached users, explicit query ids, latest query per user), however many items there are.
+    Returns (known user ids, {query_id: row}, {user_id: latest row}).
+    """
+    user_ids = {it.user_id for it in responses}
+    known = {user_id for user_id in user_ids if dependencies.known_users.get(user_id)}
+    if user_ids - known:
+        found = set((await db.execute(
+            select(models.User.id).where(models.User.id.in_(user_ids - known))
+        )).scalars())
+        for user_id in found:
+            dependencies.remember_user(user_id)
+        known |= found
+
+    query_ids = {it.query_id for it in responses if it.query_id}
+    by_id = {}
+    if query_ids:
+        stmt = (
+            select(models.UserQuery.id, models.UserQuery.user_id, models.UserQuery.query_text,
+                   models.UserQuery.created_at, models.UserQuery.claim_token)
+            .where(models.UserQuery.id.in_(query_ids))
+        )
+        if any(it.claim_token for it in responses):
+            # Hold the rows until commit so claim tokens cannot change under us
+            stmt = stmt.with_for_update()
+        rows = await db.execute(stmt)
+        by_id = {row.id: row for row in rows}
+
+    latest_for = {it.user_id for it in responses if not it.query_id} & known
+    latest = {}
+    if latest_for:
+        # Follows users.latest_query_id; users without queries come back with a NULL id
+        rows = await db.execute(crud.latest_query_stmt(models.User.id.in_(latest_for)))
+        latest = {row.user_id: row for row in rows if row.id is not None}
+
+    return known, by_id, latest
+
+
+@router.post("/batch")
+async def post_batch(payload: schemas.BatchIn, db: AsyncSession = Depends(get_db)):
+    """
+    Agent backfill: accepts a mixed array of
+      {"kind": "forecast", "forecast_type": "daily"|"monthly", "items": [...], "location_id": ...} and
+      {"kind": "chatbot_response", "user_id": ..., "response_text": ..., "query_id": ...}.
+    Items are validated in one pass and written with bulk INSERT/UPDATE in a single transaction.
+    Returns one result per item, in request order; items that fail (unknown user/query/location, invalid values)
+    are reported and skipped without aborting the rest.
+    """
+    results = [None] * len(payload.items)
+    forecasts = [(i, it) for i, it in enumerate(payload.items) if it.kind == "forecast"]
+    responses = [(i, it) for i, it in enumerate(payload.items) if it.kind == "chatbot_response"]
+
+    # ---- Validate chatbot responses ----
+    updates, notifications = [], []
+    if responses:
+        known_users, by_id, latest = await _load_targets(db, [it for _, it in responses])
+        now = datetime.utcnow()
+        for i, it in responses:
+            if it.user_id not in known_users:
+                results[i] = {"index": i, "kind": it.kind, "status": "error", "detail": "User not found"}
+                continue
+            if it.claim_token and not it.query_id:
+                results[i] = {"index": i, "kind": it.kind, "status": "error", "detail": "claim_token requires query_id"}
+                continue
+            if it.query_id:
+                target = by_id.get(it.query_id)
+                if target is None or target.user_id != it.user_id:
+                    results[i] = {"index": i, "kind": it.kind, "status": "error",
+                                  "detail": "Query not found for given query_id and user"}
+                    continue
+                if it.claim_token and target.claim_token != it.claim_token:
+                    results[i] = {"index": i, "kind": it.kind, "status": "error",
+                                  "detail": "Claim expired and was taken by another worker"}
+                    continue
+            else:
+                target = latest.get(it.user_id)
+                if target is None:
+                    results[i] = {"index": i, "kind": it.kind, "status": "error",
+                                  "detail": "No queries found for that user"}
+                    continue
+
+            updates.append({"id": target.id, "response_text": it.response_text, "response_time": now})
+            notifications.append((it.user_id, SimpleNamespace(
+                id=target.id, query_text=target.query_text, created_at=target.created_at,
+                response_text=it.response_text, response_time=now,
+            )))
+            results[i] = {"index": i, "kind": it.kind, "status": "ok", "query_id": target.id, "user_id": it.user_id}
+
+    # ---- Validate forecast locations ----
+    location_ids = {it.location_id for _, it in forecasts if it.location_id is not None}
+    if location_ids:
+        known_locations = set((await db.execute(
+            select(models.Location.id).where(models.Location.id.in_(location_ids))
+        )).scalars())
+        for i, it in forecasts:
+            if it.location_id is not None and it.location_id not in known_locations:
+                results[i] = {"index": i, "kind": it.kind, "status": "error", "detail": "Location not found"}
+        forecasts = [(i, it) for i, it in forecasts if results[i] is None]
+
+    # ---- Validate forecast values (the JSON parser lets NaN/Infinity through) ----
+    columns = {}
+    for i, it in forecasts:
+        try:
+            columns[i] = crud.item_columns(it.items)
+        except columnar.ColumnarError as exc:
+            results[i] = {"index": i, "kind": it.kind, "status": "error", "detail": str(exc)}
+    forecasts = [(i, it) for i, it in forecasts if i in columns]
+    series = [columns[i] for i, _ in forecasts]
+
+    # ---- Write everything in one transaction ----
+    stored = []
+    if forecasts:
+        stored = await crud.insert_forecasts(
+            db, [(it.forecast_type, dates, values, it.location_id)
+                 for (_, it), (dates, values) in zip(forecasts, series)]
+        )
+        for (i, it), (forecast_id, created_at) in zip(forecasts, stored):
+            results[i] = {"index": i, "kind": it.kind, "status": "ok", "records": len(it.items),
+                          "forecast_id": forecast_id, "created_at": created_at.isoformat()}
+    if updates:
+        # ORM bulk UPDATE by primary key: one executemany statement
+        await db.execute(update(models.UserQuery), updates)
+    await db.commit()
+
+    # ---- After commit: refresh the latest-forecast cache and wake long-pollers ----
+    newest = {}
+    for (_, it), (forecast_id, created_at), (dates, values) in zip(forecasts, stored, series):
+        if it.location_id is None:  # only the global forecasts are cached
+            newest[it.forecast_type] = (forecast_id, created_at, dates, values)
+    for forecast_type, (forecast_id, created_at, dates, values) in newest.items():
+        crud.cache_forecast(forecast_type, forecast_id, created_at, dates, values)
+        invalidation.forecast_stored(forecast_type, forecast_id)
+    for user_id, query in notifications:
+        response_notifier.notify(user_id, crud.response_body(query))
+        invalidation.response_posted(user_id, query.id)
+
+    failed = sum(1 for r in results if r["status"] == "error")
+    return {
+        "status": "success" if not failed else "partial",
+        "succeeded": len(results) - failed,
+        "failed": failed,
+        "results": results
+    }
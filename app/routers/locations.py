@@ -0,0 +1,153 @@
+# app/routers/locations.py
+# Per-location forecasts: register stations/regions, post their series, fetch many at once, find the nearest.
+
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import date as date_type
+from typing import List, Optional
+from app.database import get_db, IS_SQLITE
+from app.dependencies import existing_user_id
+from app import models, schemas, crud, invalidation
+from app.routers.forecast import read_forecast_upload, FORECAST_UPLOAD_OPENAPI
+from app.utils import columnar
+from app.utils.spatial import location_index
+
+if IS_SQLITE:
+    from sqlalchemy.dialects.sqlite import insert as upsert
+else:
+    from sqlalchemy.dialects.postgresql import insert as upsert
+
+router = APIRouter(prefix="/locations", tags=["locations"])
+
+MAX_LOCATIONS_PER_REQUEST = 200
+
+
+async def _ensure_index(db: AsyncSession):
+    """Load every location with coordinates into the in-memory index, once per process."""
+    if location_index.loaded:
+        return
+    rows = await db.execute(
+        select(models.Location.id, models.Location.lat, models.Location.lon)
+        .where(models.Location.lat.is_not(None), models.Location.lon.is_not(None))
+    )
+    for location_id, lat, lon in rows:
+        location_index.upsert(location_id, lat, lon)
+    location_index.loaded = True
+
+
+@router.put("/{location_id}")
+async def put_location(location_id: str, payload: schemas.LocationIn, db: AsyncSession = Depends(get_db)):
+    """
+    Agent registers or updates a location (station or region).
+    lat/lon are optional; only locations with both are found by /locations/nearest.
+    """
+    if len(location_id) > 64:
+        raise HTTPException(status_code=422, detail="location_id is limited to 64 characters")
+
+    values = payload.model_dump()
+    stmt = upsert(models.Location).values(id=location_id, **values)
+    await db.execute(stmt.on_conflict_do_update(index_elements=[models.Location.id], set_=values))
+    await db.commit()
+
+    # ✅ Keep the nearest-location index current without a reload, in every worker
+    if payload.lat is not None and payload.lon is not None:
+        location_index.upsert(location_id, payload.lat, payload.lon)
+    else:
+        location_index.remove(location_id)
+    invalidation.location_changed(location_id, payload.lat, payload.lon)
+    return {"status": "success", "id": location_id, **values}
+
+
+@router.post("/{location_id}/forecast", openapi_extra=FORECAST_UPLOAD_OPENAPI)
+async def post_location_forecast(
+    location_id: str,
+    request: Request,
+    forecast_type: str = Query(..., alias="type", pattern="^(daily|monthly)$"),
+    start: Optional[date_type] = Query(None, description="First date (application/octet-stream uploads)"),
+    step: int = Query(1, ge=1, le=columnar.MAX_STEPS["D"], description="Days/months between values (application/octet-stream uploads)"),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Agent posts a forecast series for one location, in any format POST /daily_forecast accepts.
+    The global /daily_forecast and /monthly_forecast endpoints are unaffected.
+    """
+    dates, values = await read_forecast_upload(request, forecast_type, start, step)
+    if len(values) == 0:
+        raise HTTPException(status_code=422, detail="Forecast has no values")
+
+    if await db.scalar(select(models.Location.id).where(models.Location.id == location_id)) is None:
+        raise HTTPException(status_code=404, detail="Location not found; register it with PUT /locations/{location_id}")
+
+    [(forecast_id, created_at)] = await crud.insert_forecasts(db, [(forecast_type, dates, values, location_id)])
+    await db.commit()
+    return {
+        "status": "success",
+        "location_id": location_id,
+        "records": len(values),
+        "forecast_id": forecast_id,
+        "created_at": created_at.isoformat()
+    }
+
+
+@router.get("/forecasts")
+async def get_location_forecasts(
+    ids: List[str] = Query(..., description="Location ids (repeat the parameter)"),
+    forecast_type: str = Query("daily", alias="type", pattern="^(daily|monthly)$"),
+    user_id: int = Depends(existing_user_id),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Latest forecast of a type for many locations in one call (two queries, whatever the count).
+    Locations without a forecast map to null.
+    """
+    if len(ids) > MAX_LOCATIONS_PER_REQUEST:
+        raise HTTPException(status_code=422, detail=f"At most {MAX_LOCATIONS_PER_REQUEST} locations per request")
+
+    label_key = crud.FORECAST_LABELS[forecast_type]
+    latest = await crud.latest_location_forecasts(db, forecast_type, set(ids))
+    forecasts = {}
+    for location_id in ids:
+        found = latest.get(location_id)
+        if found is None:
+            forecasts[location_id] = None
+            continue
+        forecast_id, created_at, dates, values = found
+        forecasts[location_id] = {
+            "forecast_id": forecast_id,
+            "created_at": created_at.isoformat(),
+            **crud.format_forecast_columns(dates, values, label_key)
+        }
+    return {"type": forecast_type, "forecasts": forecasts}
+
+
+@router.get("/nearest")
+async def get_nearest_locations(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    k: int = Query(1, ge=1, le=50),
+    max_km: Optional[float] = Query(None, gt=0),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    The k registered locations closest to (lat, lon), nearest first, from the in-memory index.
+    Fetch their forecasts with GET /locations/forecasts.
+    """
+    await _ensure_index(db)
+    nearest = location_index.nearest(lat, lon, k, max_km)
+    if not nearest:
+        return {"locations": []}
+
+    rows = await db.execute(
+        select(models.Location.id, models.Location.name, models.Location.lat, models.Location.lon)
+        .where(models.Location.id.in_([location_id for location_id, _ in nearest]))
+    )
+    by_id = {row.id: row for row in rows}
+    return {
+        "locations": [
+            {"id": location_id, "name": by_id[location_id].name, "lat": by_id[location_id].lat,
+             "lon": by_id[location_id].lon, "distance_km": distance}
+            for location_id, distance in nearest
+            if location_id in by_id
+        ]
+    }
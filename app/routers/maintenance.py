@@ -0,0 +1,30 @@
+# app/routers/maintenance.py
+# Operator endpoints for background jobs: retention status and manual runs.
+
+from fastapi import APIRouter, HTTPException, Query
+
+from app.jobs.retention import retention_job
+
+router = APIRouter(prefix="/maintenance", tags=["maintenance"])
+
+
+@router.get("/retention")
+async def retention_status():
+    """
+    Retention policy, the run in progress (phase, rows deleted/archived so far)
+    and the last finished run.
+    """
+    return retention_job.status()
+
+
+@router.post("/retention/run", status_code=202)
+async def run_retention(dry_run: bool = Query(False, description="Only count what would be removed")):
+    """
+    Start a retention run in the background; poll GET /maintenance/retention for progress.
+    409 if a run is already in progress in this worker (runs in other workers are skipped by the job itself).
+    """
+    try:
+        retention_job.trigger(dry_run=dry_run)
+    except RuntimeError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+    return {"status": "started", "dry_run": dry_run}
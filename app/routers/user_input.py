@@ -2,34 +2,23 @@
 # Endpoint to store user queries (history preserved).
 
 from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
-from app.database import SessionLocal
-from app import models, schemas
-from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_db
+from app import schemas, crud
 
 router = APIRouter(prefix="", tags=["user_input"])
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
 @router.post("/user_input")
-def post_user_input(payload: schemas.UserInputIn, db: Session = Depends(get_db)):
+async def post_user_input(payload: schemas.UserInputIn, db: AsyncSession = Depends(get_db)):
     """
     Store user query. Frontend provides user_id (from login) and message text.
     Returns created query id and timestamp.
     """
-    user = db.query(models.User).filter(models.User.id == payload.user_id).first()
-    if not user:
+    created = await crud.insert_user_query(db, payload.user_id, payload.message)
+    if created is None:
         raise HTTPException(status_code=404, detail="User not found")
+    await db.commit()
 
-    row = models.UserQuery(user_id=payload.user_id, query_text=payload.message, created_at=datetime.utcnow())
-    db.add(row)
-    db.commit()
-    db.refresh(row)
-    return {"query_id": row.id, "user_id": row.user_id, "created_at": row.created_at.isoformat()}
+    query_id, created_at = created
+    return {"query_id": query_id, "user_id": payload.user_id, "created_at": created_at.isoformat()}
@@ -1,8 +1,9 @@
 # app/schemas.py
 # Pydantic schemas for request/response validation.
 
-from pydantic import BaseModel, RootModel, EmailStr
-from typing import List, Optional
+from pydantic import BaseModel, RootModel, EmailStr, Field
+from typing import Annotated, List, Optional, Literal, Union
+from datetime import date as date_type
 
 
 class SignupIn(BaseModel):
@@ -24,13 +25,39 @@ class AgentResponseIn(BaseModel):
     user_id: int
     response_text: str
     query_id: Optional[int] = None
+    # Token from POST /agent/claim; when set, the answer is only accepted while the claim is still ours
+    claim_token: Optional[str] = None
 
 
 class ForecastItem(BaseModel):
-    date: str  # "YYYY-MM-DD"
+    date: date_type  # "YYYY-MM-DD"
     rainfall: float
 
 
 class ForecastList(RootModel[List[ForecastItem]]):
     """Wrapper model for a list of forecast entries"""
-    pass
\ No newline at end of file
+    pass
+
+
+class LocationIn(BaseModel):
+    name: Optional[str] = Field(None, max_length=128)
+    lat: Optional[float] = Field(None, ge=-90, le=90)
+    lon: Optional[float] = Field(None, ge=-180, le=180)
+
+
+class BatchForecastIn(BaseModel):
+    kind: Literal["forecast"]
+    forecast_type: Literal["daily", "monthly"]
+    location_id: Optional[str] = None  # None: the global forecast
+    items: List[ForecastItem] = Field(min_length=1)
+
+
+class BatchResponseIn(AgentResponseIn):
+    kind: Literal["chatbot_response"]
+
+
+class BatchIn(BaseModel):
+    """Mixed forecast uploads and chatbot responses, written in one transaction."""
+    items: List[Annotated[Union[BatchForecastIn, BatchResponseIn], Field(discriminator="kind")]] = Field(
+        min_length=1, max_length=1000
+    )
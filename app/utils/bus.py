@@ -0,0 +1,209 @@
+# app/utils/bus.py
+# Cross-worker message bus for cache invalidation: PostgreSQL LISTEN/NOTIFY, or in-process (LocalBus).
+
+import asyncio
+import os
+import uuid
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional
+
+from app.utils import fast_json
+
+# PostgreSQL channel shared by every worker of this service
+BUS_CHANNEL = os.getenv("BUS_CHANNEL", "app_invalidation")
+# Messages waiting for the listener connection (e.g. while reconnecting); past this the oldest is dropped
+BUS_QUEUE_SIZE = int(os.getenv("BUS_QUEUE_SIZE", "1000"))
+# NOTIFY payloads are limited to 8000 bytes
+MAX_PAYLOAD_BYTES = 7900
+
+Handler = Callable[[Dict[str, Any]], None]
+
+
+class LocalBus:
+    """
+    Delivers published messages to the *other* buses on the same hub; the publisher
+    updates its own state itself. With one bus per process (the default hub) that is nobody:
+    a single worker has no peers. Several LocalBus on one hub stand in for several workers.
+    Handlers run on the event loop and must be quick and idempotent.
+    """
+
+    def __init__(self, hub: Optional[List["LocalBus"]] = None):
+        self.hub = hub if hub is not None else []
+        self.hub.append(self)
+        self._handlers: Dict[str, List[Handler]] = defaultdict(list)
+        self._reset_callbacks: List[Callable[[], None]] = []
+        self.published = 0
+        self.received = 0
+        self.dropped = 0
+        self.handler_errors = 0
+
+    def subscribe(self, channel: str, handler: Handler):
+        self._handlers[channel].append(handler)
+
+    def on_reset(self, callback: Callable[[], None]):
+        """callback() runs when messages may have been missed (listener reconnected): drop everything cached."""
+        self._reset_callbacks.append(callback)
+
+    def publish(self, channel: str, payload: Dict[str, Any]):
+        """Send payload (small and JSON-serializable: ids, not bodies) to every other worker."""
+        self.published += 1
+        for peer in self.hub:
+            if peer is not self:
+                peer._deliver(channel, payload)
+
+    def _deliver(self, channel: str, payload: Dict[str, Any]):
+        self.received += 1
+        for handler in self._handlers.get(channel, ()):
+            try:
+                handler(payload)
+            except Exception as exc:
+                self.handler_errors += 1
+                print(f"⚠️ Bus handler for {channel!r} failed: {type(exc).__name__}: {exc}")
+
+    def _reset(self):
+        for callback in self._reset_callbacks:
+            try:
+                callback()
+            except Exception as exc:
+                self.handler_errors += 1
+                print(f"⚠️ Bus reset callback failed: {type(exc).__name__}: {exc}")
+
+    @property
+    def connected(self) -> bool:
+        return True
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": type(self).__name__,
+            "connected": self.connected,
+            "published": self.published,
+            "received": self.received,
+            "dropped": self.dropped,
+            "handler_errors": self.handler_errors,
+        }
+
+
+class PostgresBus(LocalBus):
+    """
+    NOTIFY on a shared channel; every worker LISTENs on its own asyncpg connection (outside the
+    SQLAlchemy pool, so count one extra connection per worker). Messages carry the sender's id
+    and a worker skips its own. publish() never blocks a request: messages are queued and sent
+    by a background task that also reconnects, after which on_reset callbacks run because
+    anything sent meanwhile was missed.
+    """
+
+    def __init__(self, dsn: str, channel: str = BUS_CHANNEL, queue_size: int = BUS_QUEUE_SIZE):
+        super().__init__()
+        self.dsn = dsn
+        self.channel = channel
+        self.origin = uuid.uuid4().hex[:12]
+        self.reconnects = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._queue_size = queue_size
+        self._conn = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def connected(self) -> bool:
+        return self._conn is not None and not self._conn.is_closed()
+
+    def publish(self, channel: str, payload: Dict[str, Any]):
+        if self._queue is None:
+            return  # not started (CLI scripts): nobody to tell
+        text = fast_json.dumps_str({"o": self.origin, "c": channel, "p": payload})
+        if len(text.encode()) > MAX_PAYLOAD_BYTES:
+            self.dropped += 1
+            print(f"⚠️ Bus message on {channel!r} is too large for NOTIFY; dropped.")
+            return
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.dropped += 1
+        self._queue.put_nowait(text)
+        self.published += 1
+
+    def _on_notify(self, connection, pid, channel, text):
+        try:
+            message = fast_json.loads(text)
+        except ValueError:
+            return
+        if message.get("o") != self.origin:
+            self._deliver(message["c"], message["p"])
+
+    async def start(self):
+        """Start listening (lifespan startup). Returns at once; connecting is retried in the background."""
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Send what is queued (briefly), then close the listener (lifespan shutdown)."""
+        if self._task is None:
+            return
+        if self.connected:
+            try:
+                await asyncio.wait_for(self._flush(), 2.0)
+            except asyncio.TimeoutError:
+                pass
+        self._task.cancel()
+        try:
+            await self._task
+        except (asyncio.CancelledError, Exception):
+            pass
+        self._task = None
+
+    async def _flush(self):
+        while not self._queue.empty():
+            await asyncio.sleep(0.01)
+
+    async def _run(self):
+        import asyncpg
+
+        backoff = 0.5
+        first = True
+        while True:
+            conn = None
+            try:
+                conn = await asyncpg.connect(self.dsn)
+                lost = asyncio.Event()
+                conn.add_termination_listener(lambda _conn: lost.set())
+                await conn.add_listener(self.channel, self._on_notify)
+                self._conn = conn
+                if not first:
+                    self.reconnects += 1
+                    self._reset()  # anything sent while we were away was missed
+                first, backoff = False, 0.5
+                await self._send_until(conn, lost)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                print(f"⚠️ Invalidation bus connection failed ({type(exc).__name__}: {exc}); retrying in {backoff:.1f}s.")
+            finally:
+                self._conn = None
+                if conn is not None and not conn.is_closed():
+                    conn.terminate()
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30.0)
+
+    async def _send_until(self, conn, lost: asyncio.Event):
+        lost_wait = asyncio.create_task(lost.wait())
+        try:
+            while True:
+                get = asyncio.create_task(self._queue.get())
+                done, _ = await asyncio.wait({get, lost_wait}, return_when=asyncio.FIRST_COMPLETED)
+                if get not in done:
+                    get.cancel()
+                    return
+                text = get.result()
+                try:
+                    await conn.execute("SELECT pg_notify($1, $2)", self.channel, text)
+                except Exception:
+                    self._queue.put_nowait(text)  # resent after the reconnect
+                    raise
+        finally:
+            lost_wait.cancel()
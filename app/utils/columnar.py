@@ -0,0 +1,135 @@
+# app/utils/columnar.py
+# Vectorized (numpy) helpers for the columnar forecast formats: parallel dates/values arrays
+# and packed little-endian float32 values with a start date and step.
+
+import re
+from datetime import date
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+# Content types offered next to plain application/json
+COLUMNS_MEDIA_TYPE = "application/vnd.sail.forecast-columns+json"
+BINARY_MEDIA_TYPE = "application/octet-stream"
+
+# Series spacing unit per forecast_type: daily steps in days, monthly in months
+STEP_UNITS = {"daily": "D", "monthly": "M"}
+# Largest step accepted per unit; far larger ones overflow the datetime64 arithmetic
+MAX_STEPS = {"D": 366, "M": 120}
+
+_ISO_DATE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+_WEEKDAYS = np.array(["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"])
+_MONTHS = np.array(["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"])
+
+
+class ColumnarError(ValueError):
+    """Malformed columnar payload; routers turn it into a 422."""
+
+
+def to_dates(values: Sequence) -> np.ndarray:
+    """ISO strings or date objects -> datetime64[D], parsed in one call."""
+    try:
+        array = np.asarray(values, dtype="datetime64[D]")
+    except (TypeError, ValueError) as exc:
+        raise ColumnarError(f"Invalid date in dates: {exc}") from None
+    # null parses as NaT, nested lists as a 2-D array
+    if array.ndim != 1 or np.isnat(array).any():
+        raise ColumnarError("dates must be a flat list of dates")
+    return array
+
+
+def to_values(values: Sequence) -> np.ndarray:
+    try:
+        array = np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError) as exc:
+        raise ColumnarError(f"Invalid number in values: {exc}") from None
+    if array.ndim != 1 or not np.isfinite(array).all():
+        raise ColumnarError("values must be a flat list of finite numbers")
+    return array
+
+
+def from_columns(dates: Sequence, values: Sequence) -> Tuple[np.ndarray, np.ndarray]:
+    """Validate parallel dates/values arrays."""
+    if not isinstance(dates, list) or not isinstance(values, list):
+        raise ColumnarError("dates and values must be arrays")
+    if len(dates) != len(values):
+        raise ColumnarError(f"dates and values differ in length ({len(dates)} != {len(values)})")
+    return to_dates(dates), to_values(values)
+
+
+def from_json_columns(dates, values) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Validate the {"dates", "values"} arrays of a JSON upload as strictly as the row format:
+    dates must be "YYYY-MM-DD" strings and values JSON numbers. numpy alone would cast
+    epoch-day ints, booleans, "2021-10" or datetimes to dates and numeric strings to floats.
+    """
+    if not isinstance(dates, list) or not isinstance(values, list):
+        raise ColumnarError("dates and values must be arrays")
+    for item in dates:
+        if not isinstance(item, str) or not _ISO_DATE.fullmatch(item):
+            raise ColumnarError(f"Invalid date in dates: {item!r} (expected \"YYYY-MM-DD\")")
+    for item in values:
+        if type(item) not in (int, float):  # bool is an int subclass: excluded on purpose
+            raise ColumnarError(f"Invalid number in values: {item!r}")
+    return from_columns(dates, values)
+
+
+def series_dates(start: date, step: int, count: int, unit: str) -> np.ndarray:
+    """
+    Dates of a regular series: start + i * step days (unit "D") or months (unit "M").
+    Month steps keep start's day of month, clipped to the month's last day.
+    """
+    offsets = np.arange(count) * step
+    if unit == "D":
+        return np.datetime64(start, "D") + offsets
+    months = np.datetime64(start, "M") + offsets
+    last_days = (months + 1).astype("datetime64[D]") - 1
+    return np.minimum(months.astype("datetime64[D]") + (start.day - 1), last_days)
+
+
+def from_float32(body: bytes, start: date, step: int, unit: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Decode packed little-endian float32 values laid out from start every step units."""
+    if not 1 <= step <= MAX_STEPS[unit]:
+        raise ColumnarError(f"step must be between 1 and {MAX_STEPS[unit]}")
+    if len(body) % 4:
+        raise ColumnarError("application/octet-stream body must be a whole number of float32 values")
+    raw = np.frombuffer(body, dtype="<f4")
+    if not np.isfinite(raw).all():
+        raise ColumnarError("values must be finite")
+    # str() of a float32 is its shortest repr ("12.3", not 12.300000190734863)
+    values = raw.astype(str).astype(np.float64)
+    return series_dates(start, step, len(values), unit), values
+
+
+def regular_step(dates: np.ndarray, unit: str) -> Optional[int]:
+    """The constant step (in unit) between dates, or None if the series is irregular."""
+    if len(dates) < 2:
+        return 1
+    if unit == "D":
+        steps = np.diff(dates.astype(np.int64))
+    else:
+        steps = np.diff(dates.astype("datetime64[M]").astype(np.int64))
+    step = int(steps[0])
+    if step <= 0 or (steps != step).any():
+        return None
+    # Month steps must also keep the first date's day of month
+    if unit == "M" and (series_dates(dates[0].item(), step, len(dates), "M") != dates).any():
+        return None
+    return step
+
+
+def to_float32(values: np.ndarray) -> bytes:
+    return np.asarray(values, dtype="<f4").tobytes()
+
+
+def labels(dates: np.ndarray, label_key: str) -> np.ndarray:
+    """Day ("day": Mon..Sun) or month ("month": Jan..Dec) abbreviations, without strftime."""
+    if label_key == "day":
+        # 1970-01-01 was a Thursday (index 3 with Monday = 0)
+        return _WEEKDAYS[(dates.astype(np.int64) + 3) % 7]
+    return _MONTHS[dates.astype("datetime64[M]").astype(np.int64) % 12]
+
+
+def iso_dates(dates: np.ndarray) -> list:
+    return np.datetime_as_string(dates, unit="D").tolist()
@@ -0,0 +1,112 @@
+# app/utils/compression.py
+# Response compression: Brotli when the client accepts it and the brotli package is installed, gzip otherwise.
+
+import os
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.middleware.gzip import DEFAULT_EXCLUDED_CONTENT_TYPES, GZipMiddleware, IdentityResponder
+
+try:
+    import brotli
+except ImportError:  # optional: without it every client gets gzip
+    brotli = None
+
+# Bodies smaller than this go out as-is; headers and framing dominate below ~1 KB
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+# zlib level 6 is most of level 9's ratio for a fraction of the CPU
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+# Brotli 4 compresses better than gzip 6 at similar speed; 11 is for static assets only
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+
+
+def accepted_encoding(accept_encoding: str, offered) -> Optional[str]:
+    """
+    First of `offered` that the Accept-Encoding header allows (q > 0), or None.
+    accepted_encoding("gzip, br;q=0", ("br", "gzip")) == "gzip"
+    """
+    allowed = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        allowed[coding] = quality
+    for coding in offered:
+        if allowed.get(coding, allowed.get("*", 0.0)) > 0:
+            return coding
+    return None
+
+
+class BrotliResponder(IdentityResponder):
+    """starlette's GZipResponder, with a Brotli stream instead of zlib."""
+
+    content_encoding = "br"
+
+    def __init__(self, app, minimum_size: int, quality: int, *, exclude_content_types=DEFAULT_EXCLUDED_CONTENT_TYPES):
+        super().__init__(app, minimum_size, exclude_content_types=exclude_content_types)
+        self.quality = quality
+        self._compressor = None
+
+    async def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        if self._compressor is None:
+            self._compressor = brotli.Compressor(quality=self.quality)
+        if more_body:
+            # Flush per chunk so streamed NDJSON/history pages still arrive incrementally
+            return self._compressor.process(body) + self._compressor.flush()
+        return self._compressor.process(body) + self._compressor.finish()
+
+
+class CompressionMiddleware:
+    """
+    Compresses responses of at least minimum_size bytes (streamed bodies included).
+    PNG and other already-compressed types are passed through.
+    A strong ETag on a compressed response is weakened (W/"..."): the bytes differ per
+    encoding, but If-None-Match uses weak comparison, so revalidation still hits 304.
+    """
+
+    def __init__(
+        self,
+        app,
+        minimum_size: int = COMPRESSION_MIN_SIZE,
+        gzip_level: int = GZIP_LEVEL,
+        brotli_quality: int = BROTLI_QUALITY,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.brotli_quality = brotli_quality
+        self.gzip = GZipMiddleware(app, minimum_size=minimum_size, compresslevel=gzip_level)
+        self.offered = ("br", "gzip") if brotli is not None else ("gzip",)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        coding = accepted_encoding(Headers(scope=scope).get("accept-encoding", ""), self.offered)
+        if coding is None:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_weak_etag(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(raw=message["headers"])
+                etag = headers.get("etag")
+                if etag and not etag.startswith("W/") and "content-encoding" in headers:
+                    headers["ETag"] = "W/" + etag
+            await send(message)
+
+        if coding == "br":
+            responder = BrotliResponder(self.app, self.minimum_size, self.brotli_quality)
+            await responder(scope, receive, send_weak_etag)
+        else:
+            # GZipMiddleware re-checks Accept-Encoding itself; it contains gzip here
+            await self.gzip(scope, receive, send_weak_etag)
@@ -0,0 +1,69 @@
+# app/utils/drain.py
+# Graceful drain: on SIGTERM, release long-polls and stop background jobs before the server
+# waits for open connections to finish (it only runs the lifespan shutdown after that).
+
+import asyncio
+import signal
+import threading
+from typing import Callable, List
+
+
+class Drain:
+    """
+    begin() flips `draining` and runs the registered callbacks (sync, or async ones as tasks)
+    exactly once. Triggered by SIGTERM/SIGINT once install_signal_handlers() ran, else by the
+    lifespan shutdown.
+    """
+
+    def __init__(self):
+        self.draining = False
+        self._callbacks: List[Callable] = []
+        self._tasks: List[asyncio.Task] = []
+
+    def reset(self):
+        """Lifespan startup: forget the previous run's callbacks (the app may be started again in-process)."""
+        self.draining = False
+        self._callbacks.clear()
+        self._tasks.clear()
+
+    def on_drain(self, callback: Callable):
+        self._callbacks.append(callback)
+
+    def begin(self):
+        if self.draining:
+            return
+        self.draining = True
+        print("⏳ Draining: releasing long-polls and stopping background jobs.")
+        for callback in self._callbacks:
+            result = callback()
+            if asyncio.iscoroutine(result):
+                self._tasks.append(asyncio.ensure_future(result))
+
+    async def wait(self):
+        """Wait for the async callbacks started by begin()."""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def install_signal_handlers(self):
+        """
+        Chain onto the server's SIGTERM/SIGINT handlers (uvicorn, or gunicorn's UvicornWorker, installs
+        them before the lifespan startup): the server still stops accepting and waits for connections,
+        and begin() runs on the event loop meanwhile. Signals only reach the main thread, so
+        elsewhere (TestClient) this is a no-op.
+        """
+        if threading.current_thread() is not threading.main_thread():
+            return
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            previous = signal.getsignal(sig)
+            if not callable(previous) or previous is signal.default_int_handler:
+                continue  # no server handler to chain onto
+
+            def handler(signum, frame, previous=previous):
+                loop.call_soon_threadsafe(self.begin)
+                previous(signum, frame)
+
+            signal.signal(sig, handler)
+
+
+drain = Drain()
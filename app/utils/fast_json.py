@@ -0,0 +1,41 @@
+# app/utils/fast_json.py
+# JSON encoding for responses and streamed bodies: orjson when installed, the stdlib json module otherwise.
+
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # optional: same output shape, just slower
+    orjson = None
+
+# Non-str dict keys are stringified like json.dumps does; numpy arrays and scalars pass through as-is.
+_ORJSON_OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY) if orjson is not None else 0
+
+
+def dumps(content: Any) -> bytes:
+    """Compact UTF-8 JSON bytes, e.g. dumps({"a": 1}) == b'{"a":1}'."""
+    if orjson is not None:
+        return orjson.dumps(content, option=_ORJSON_OPTIONS)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def dumps_str(content: Any) -> str:
+    """dumps() as str, for generators that yield text chunks."""
+    return dumps(content).decode("utf-8")
+
+
+def loads(data):
+    """Parse a JSON document from bytes or str; raises ValueError on invalid input."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered through dumps(); the app-wide default response class."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,97 @@
+# app/utils/forecast_cache.py
+# In-process cache of the latest formatted forecast per forecast_type.
+
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+# Seconds a cached forecast stays valid. Other workers' writes arrive through the invalidation
+# bus (app/invalidation.py); the TTL bounds staleness if a message is lost.
+FORECAST_CACHE_TTL = float(os.getenv("FORECAST_CACHE_TTL", "60"))
+
+
+class ForecastCache:
+    """
+    Holds the latest forecast for each forecast_type ('daily', 'monthly'): its series
+    (datetime64[D] dates, float values) and the already-rendered JSON response body (bytes).
+    Writers call set() after committing; readers call get() before touching the DB.
+    """
+
+    def __init__(self, ttl: float = FORECAST_CACHE_TTL):
+        self.ttl = ttl
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        # Newest forecast id known per type (from other workers): older ones are not cached
+        self._newest: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, forecast_type: str) -> Optional[Dict[str, Any]]:
+        """Return the cached entry for forecast_type, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(forecast_type)
+            if entry is None or time.monotonic() - entry["stored_at"] > self.ttl:
+                self._entries.pop(forecast_type, None)
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry
+
+    def set(self, forecast_type: str, forecast_id: int, created_at, body: bytes, dates, values):
+        """
+        Store the rendered body and series for forecast_type.
+        An older forecast never replaces a newer one (concurrent readers may race a writer).
+        """
+        with self._lock:
+            current = self._entries.get(forecast_type)
+            if current is not None and current["forecast_id"] > forecast_id:
+                return
+            if forecast_id < self._newest.get(forecast_type, 0):
+                return
+            self._entries[forecast_type] = {
+                "forecast_id": forecast_id,
+                "created_at": created_at,
+                "body": body,
+                "dates": dates,
+                "values": values,
+                "stored_at": time.monotonic(),
+            }
+
+    def invalidate(self, forecast_type: Optional[str] = None):
+        """Drop one forecast_type, or everything when forecast_type is None."""
+        with self._lock:
+            if forecast_type is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(forecast_type, None)
+
+    def newer_exists(self, forecast_type: str, forecast_id: int):
+        """
+        Another worker stored forecast_id: drop an older cached entry, and refuse older ones
+        from readers that loaded before the message arrived.
+        """
+        with self._lock:
+            self._newest[forecast_type] = max(self._newest.get(forecast_type, 0), forecast_id)
+            current = self._entries.get(forecast_type)
+            if current is not None and current["forecast_id"] < forecast_id:
+                del self._entries[forecast_type]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "ttl_seconds": self.ttl,
+                "entries": {
+                    ftype: {
+                        "forecast_id": entry["forecast_id"],
+                        "created_at": entry["created_at"].isoformat(),
+                        "age_seconds": round(time.monotonic() - entry["stored_at"], 3),
+                    }
+                    for ftype, entry in self._entries.items()
+                },
+            }
+
+
+forecast_cache = ForecastCache()
@@ -0,0 +1,99 @@
+# app/utils/forecast_stats.py
+# Vectorized (numpy) forecast aggregates for GET /forecast_summary, computed once when a forecast is posted.
+
+import os
+from typing import Any, Dict
+
+import numpy as np
+
+# A day (or month) counts as rainy from this many mm
+RAINY_DAY_MM = float(os.getenv("RAINY_DAY_MM", "1.0"))
+# Earlier forecasts (same type and location) that make up the history a new forecast is compared with
+SUMMARY_HISTORY_FORECASTS = int(os.getenv("SUMMARY_HISTORY_FORECASTS", "100"))
+
+
+def _round(value) -> float:
+    return round(float(value), 3)
+
+
+def _group_sums(keys: np.ndarray, values: np.ndarray):
+    """(unique sorted keys, per-key sums, per-key counts) for integer keys."""
+    unique, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+    return unique, np.bincount(inverse, weights=values, minlength=len(unique)), counts
+
+
+def latest_per_date(dates: np.ndarray, values: np.ndarray):
+    """
+    Collapse overlapping history (consecutive forecasts repeat dates) to one value per date,
+    keeping the last occurrence: callers pass points oldest forecast first.
+    """
+    if len(dates) == 0:
+        return dates, values
+    reversed_dates = dates[::-1]
+    unique, first = np.unique(reversed_dates, return_index=True)
+    return unique, values[::-1][first]
+
+
+def summarize(dates: np.ndarray, values: np.ndarray, history_dates: np.ndarray, history_values: np.ndarray) -> Dict[str, Any]:
+    """
+    Aggregates of one forecast series (datetime64[D] dates sorted ascending, float values),
+    compared with earlier forecasts of the same type and location (history_*: one value per date).
+    - totals per ISO week (weeks start on Monday) and per month,
+    - wettest / driest point, rainy points (>= RAINY_DAY_MM),
+    - per calendar month: the forecast mean against the historical mean of that calendar month.
+    """
+    count = len(values)
+    if count == 0:
+        return {"count": 0}
+
+    days = dates.astype(np.int64)
+    # 1970-01-01 was a Thursday: shift by 3 so integer division lands weeks on Mondays
+    week_keys, week_totals, week_counts = _group_sums((days + 3) // 7, values)
+    month_keys, month_totals, month_counts = _group_sums(dates.astype("datetime64[M]").astype(np.int64), values)
+    wettest, driest = int(np.argmax(values)), int(np.argmin(values))
+
+    # Climatology: historical mean per calendar month (0 = Jan), from earlier forecasts only
+    normal = np.full(12, np.nan)
+    samples = np.zeros(12, dtype=np.int64)
+    history_mean = None
+    if len(history_values):
+        calendar = history_dates.astype("datetime64[M]").astype(np.int64) % 12
+        sums = np.bincount(calendar, weights=history_values, minlength=12)
+        samples = np.bincount(calendar, minlength=12)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            normal = sums / samples
+        history_mean = _round(history_values.mean())
+
+    month_means = month_totals / month_counts
+    month_normals = normal[month_keys % 12]
+    mean = values.mean()
+    return {
+        "count": count,
+        "start": str(dates[0]),
+        "end": str(dates[-1]),
+        "total": _round(values.sum()),
+        "mean": _round(mean),
+        "max": {"date": str(dates[wettest]), "rainfall": _round(values[wettest])},
+        "min": {"date": str(dates[driest]), "rainfall": _round(values[driest])},
+        "rainy_count": int((values >= RAINY_DAY_MM).sum()),
+        "weekly_totals": [
+            {"week_start": str(np.datetime64(int(key) * 7 - 3, "D")), "total": _round(total), "count": int(n)}
+            for key, total, n in zip(week_keys.tolist(), week_totals, week_counts)
+        ],
+        "monthly": [
+            {
+                "month": str(np.datetime64(int(key), "M")),
+                "total": _round(total),
+                "mean": _round(month_mean),
+                "normal": None if np.isnan(month_normal) else _round(month_normal),
+                "anomaly": None if np.isnan(month_normal) else _round(month_mean - month_normal),
+                "normal_samples": int(samples[key % 12]),
+            }
+            for key, total, month_mean, month_normal in zip(month_keys.tolist(), month_totals, month_means, month_normals)
+        ],
+        "history": {
+            "points": int(len(history_values)),
+            "mean": history_mean,
+            "anomaly": None if history_mean is None else _round(mean - history_mean),
+        },
+    }
@@ -0,0 +1,102 @@
+# app/utils/http_cache.py
+# Helpers for ETag / Last-Modified conditional GET handling and Accept negotiation.
+
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional, Sequence
+
+from fastapi import Request, Response
+
+
+def make_etag(*parts) -> str:
+    """Build a strong ETag from identifying values, e.g. make_etag("daily", row.id, row.created_at)."""
+    tokens = []
+    for part in parts:
+        if isinstance(part, datetime):
+            if part.tzinfo is None:
+                part = part.replace(tzinfo=timezone.utc)
+            part = f"{part.timestamp():.6f}"
+        tokens.append(str(part))
+    return '"' + "-".join(tokens) + '"'
+
+
+def http_date(value: datetime) -> str:
+    """Format a naive UTC (or aware) datetime as an HTTP-date."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """
+    True when the client's cached copy is still current.
+    If-None-Match takes precedence over If-Modified-Since (RFC 9110 §13.2.2).
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # Weak comparison: a compressed response carries W/"<etag>" (see app/utils/compression.py)
+        candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in candidates or etag.removeprefix("W/") in candidates
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        modified = last_modified if last_modified.tzinfo else last_modified.replace(tzinfo=timezone.utc)
+        # HTTP dates have one-second resolution
+        return modified.replace(microsecond=0) <= since
+
+    return False
+
+
+def set_cache_headers(response: Response, etag: str, last_modified: Optional[datetime] = None):
+    """Attach validators; no-cache makes clients revalidate on every poll."""
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    if last_modified is not None:
+        response.headers["Last-Modified"] = http_date(last_modified)
+
+
+def not_modified(etag: str, last_modified: Optional[datetime] = None) -> Response:
+    """Empty 304 response carrying the same validators."""
+    response = Response(status_code=304)
+    set_cache_headers(response, etag, last_modified)
+    return response
+
+
+def preferred_media_type(request: Request, offered: Sequence[str]) -> Optional[str]:
+    """
+    Pick one of `offered` (default first) from the Accept header, honouring q-values
+    and wildcards. None when the client accepts none of them (answer 406).
+    """
+    accept = request.headers.get("accept")
+    if not accept:
+        return offered[0]
+
+    ranges = []
+    for position, part in enumerate(accept.split(",")):
+        media_range, *params = [token.strip() for token in part.split(";")]
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if media_range and quality > 0:
+            ranges.append((-quality, position, media_range.lower()))
+
+    for _, _, media_range in sorted(ranges):
+        if media_range == "*/*":
+            return offered[0]
+        for media_type in offered:
+            if media_range == media_type or (
+                media_range.endswith("/*") and media_type.startswith(media_range[:-1])
+            ):
+                return media_type
+    return None
@@ -0,0 +1,229 @@
+# app/utils/metrics.py
+# Request latency, per-request DB query accounting and pool gauges, rendered in Prometheus text format.
+
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+# Add a Server-Timing header (db / app durations) to every response when enabled
+SERVER_TIMING = os.getenv("SERVER_TIMING", "false").lower() in ("1", "true", "yes")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50)
+POOL_WAIT_BUCKETS = (0.0001, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a label tuple."""
+
+    def __init__(self, name: str, help_text: str, buckets: Iterable[float]):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self._series: Dict[Labels, List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # [per-bucket counts..., +Inf count, sum]
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {key: list(series) for key, series in self._series.items()}
+        for key, series in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{_fmt_labels(key + (('le', le),))} {cumulative}")
+            lines.append(f"{self.name}_sum{_fmt_labels(key)} {series[-1]}")
+            lines.append(f"{self.name}_count{_fmt_labels(key)} {cumulative}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_fmt_labels(key)} {value}")
+        return lines
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _fmt_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+# ---- Metric definitions ----
+REQUEST_LATENCY = Histogram("http_request_duration_seconds", "Request latency by route.", LATENCY_BUCKETS)
+REQUEST_QUERIES = Histogram("http_request_db_queries", "DB queries issued per request, by route.", QUERY_COUNT_BUCKETS)
+REQUEST_DB_TIME = Histogram("http_request_db_seconds", "Time spent in DB queries per request, by route.", LATENCY_BUCKETS)
+REQUESTS_TOTAL = Counter("http_requests_total", "Requests by route and status code.")
+DB_QUERIES_TOTAL = Counter("db_queries_total", "All DB queries, including those outside requests.")
+POOL_WAIT = Histogram("db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection.", POOL_WAIT_BUCKETS)
+
+# Extra text blocks (gauges, cache stats...) computed at scrape time
+_collectors: List[Callable[[], List[str]]] = []
+
+
+def register_collector(collector: Callable[[], List[str]]):
+    """collector() returns Prometheus text lines; it runs on every /metrics scrape."""
+    _collectors.append(collector)
+
+
+def gauge_lines(name: str, help_text: str, samples: Iterable[Tuple[Dict[str, str], float]], kind: str = "gauge") -> List[str]:
+    """Text lines for a metric whose values are read at scrape time (kind: gauge or counter)."""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    for labels, value in samples:
+        lines.append(f"{name}{_fmt_labels(tuple(sorted(labels.items())))} {value}")
+    return lines
+
+
+def render_metrics() -> str:
+    lines: List[str] = []
+    for metric in (REQUEST_LATENCY, REQUEST_QUERIES, REQUEST_DB_TIME, REQUESTS_TOTAL, DB_QUERIES_TOTAL, POOL_WAIT):
+        lines.extend(metric.render())
+    for collector in _collectors:
+        lines.extend(collector())
+    return "\n".join(lines) + "\n"
+
+
+# ---- Per-request DB accounting ----
+class RequestStats:
+    __slots__ = ("queries", "db_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+# SQLAlchemy's async greenlets inherit the request task's context, so cursor events see this.
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    return _request_stats.get()
+
+
+def instrument_engine(engine):
+    """Count queries and DB time on an (async) engine, plus pool gauges."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        DB_QUERIES_TOTAL.inc()
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_seconds += elapsed
+
+    pool = sync_engine.pool
+
+    def pool_collector() -> List[str]:
+        samples = []
+        for name in ("size", "checkedout", "checkedin"):
+            method = getattr(pool, name, None)
+            if callable(method):
+                samples.append(({"state": name}, method()))
+        lines = gauge_lines("db_pool_connections", "Connection pool state.", samples)
+        size, checkedout = getattr(pool, "size", None), getattr(pool, "checkedout", None)
+        max_overflow = getattr(pool, "_max_overflow", 0)
+        if callable(size) and callable(checkedout) and size() + max(max_overflow, 0) > 0:
+            saturation = checkedout() / (size() + max(max_overflow, 0))
+            lines += gauge_lines("db_pool_saturation", "Checked-out connections / pool capacity.", [({}, round(saturation, 4))])
+        return lines
+
+    register_collector(pool_collector)
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """Records how long each connection checkout waited on the pool (including opening new connections)."""
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            POOL_WAIT.observe(time.perf_counter() - start)
+
+
+# ---- ASGI middleware ----
+class MetricsMiddleware:
+    """
+    Times every HTTP request by route template (not raw path, to bound cardinality)
+    and attributes DB queries to it. Optionally emits a Server-Timing header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if SERVER_TIMING:
+                    total_ms = (time.perf_counter() - start) * 1000
+                    timing = (
+                        f'db;dur={stats.db_seconds * 1000:.2f};desc="{stats.queries} queries", '
+                        f"app;dur={total_ms:.2f}"
+                    )
+                    message = {**message, "headers": list(message.get("headers", [])) + [(b"server-timing", timing.encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_stats.reset(token)
+            route = scope.get("route")
+            labels = {"method": scope["method"], "route": getattr(route, "path", "unmatched")}
+            REQUEST_LATENCY.observe(time.perf_counter() - start, **labels)
+            REQUEST_QUERIES.observe(stats.queries, **labels)
+            REQUEST_DB_TIME.observe(stats.db_seconds, **labels)
+            REQUESTS_TOTAL.inc(**labels, status=str(status_code))
@@ -0,0 +1,93 @@
+# app/utils/notifier.py
+# asyncio wake-up registry for long-polling clients waiting on chatbot responses.
+
+import asyncio
+import threading
+from collections import defaultdict
+from typing import Any, Dict, Hashable, Optional, Set, Tuple
+
+_Waiter = Tuple[asyncio.AbstractEventLoop, asyncio.Future]
+
+# Payload meaning "something changed, re-read the DB" (wake-ups from other workers carry no body)
+RECHECK = object()
+
+
+class Notifier:
+    """
+    Maps a key (e.g. a user id) to the futures of requests currently waiting on it.
+    An idle waiter costs one Future, so thousands per worker are cheap.
+    notify() may be called from the event loop or from a threadpool worker.
+    """
+
+    def __init__(self):
+        self._waiters: Dict[Hashable, Set[_Waiter]] = defaultdict(set)
+        self._lock = threading.Lock()
+        self.closed = False
+
+    def register(self, key: Hashable) -> _Waiter:
+        """
+        Start listening on key. Register before checking the DB so a notify that
+        lands between the check and the wait is not lost.
+        """
+        loop = asyncio.get_running_loop()
+        waiter = (loop, loop.create_future())
+        with self._lock:
+            self._waiters[key].add(waiter)
+        return waiter
+
+    def unregister(self, key: Hashable, waiter: _Waiter):
+        with self._lock:
+            waiters = self._waiters.get(key)
+            if waiters is not None:
+                waiters.discard(waiter)
+                if not waiters:
+                    del self._waiters[key]
+
+    async def wait(self, waiter: _Waiter, timeout: float) -> Optional[Any]:
+        """Return the notified payload, or None on timeout (immediately once closed)."""
+        _, future = waiter
+        if self.closed:
+            return None
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def notify(self, key: Hashable, payload: Any) -> int:
+        """Wake every waiter on key with payload. Returns the number woken."""
+        with self._lock:
+            waiters = self._waiters.pop(key, set())
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_resolve, future, payload)
+        return len(waiters)
+
+    def wake_all(self, payload: Any) -> int:
+        """Wake every waiter on every key with payload."""
+        with self._lock:
+            waiters = [waiter for key_waiters in self._waiters.values() for waiter in key_waiters]
+            self._waiters.clear()
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_resolve, future, payload)
+        return len(waiters)
+
+    def open(self):
+        """Lifespan startup: waits block again."""
+        self.closed = False
+
+    def close(self):
+        """Graceful drain: release every waiter now (as a timeout) and stop new waits from blocking."""
+        self.closed = True
+        self.wake_all(None)
+
+    def waiting(self) -> int:
+        with self._lock:
+            return sum(len(waiters) for waiters in self._waiters.values())
+
+
+def _resolve(future: asyncio.Future, payload: Any):
+    if not future.done():
+        future.set_result(payload)
+
+
+# Keyed by user id; payload is the GET /chatbot_response body for the answered query
+response_notifier = Notifier()
@@ -0,0 +1,120 @@
+# app/utils/passwords.py
+# scrypt password hashing on a dedicated, bounded thread pool (hashlib.scrypt releases the GIL).
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from fastapi import HTTPException
+
+# Stored as "scrypt$n$r$p$salt$hash" (salt/hash urlsafe base64), so parameters can be
+# raised later: rows hashed with older parameters are upgraded on the next login.
+SCRYPT_N = int(os.getenv("PASSWORD_SCRYPT_N", str(2 ** 14)))
+SCRYPT_R = int(os.getenv("PASSWORD_SCRYPT_R", "8"))
+SCRYPT_P = int(os.getenv("PASSWORD_SCRYPT_P", "1"))
+SALT_BYTES = 16
+HASH_BYTES = 32
+
+# Each hash takes tens of ms of CPU: run them on their own threads so they never occupy the
+# event loop or the threadpool shared with other routes. Beyond PASSWORD_MAX_PENDING
+# queued + running hashes, requests are turned away with 503 instead of queueing without bound.
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_MAX_PENDING = int(os.getenv("PASSWORD_MAX_PENDING", str(PASSWORD_WORKERS * 32)))
+
+_executor: Optional[ThreadPoolExecutor] = None
+_pending = 0
+rejected = 0
+
+
+def _b64(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _unb64(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    # OpenSSL needs roughly 128 * r * (n + p + 2) bytes; its default cap is 32 MiB
+    maxmem = 128 * r * (n + p + 2) + 1024 * 1024
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, maxmem=maxmem, dklen=HASH_BYTES)
+
+
+def hash_password(password: str) -> str:
+    """Hash with the configured scrypt parameters and a fresh random salt."""
+    salt = os.urandom(SALT_BYTES)
+    digest = _scrypt(password, salt, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    return f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${_b64(salt)}${_b64(digest)}"
+
+
+def is_hashed(stored: str) -> bool:
+    return stored.startswith("scrypt$")
+
+
+def verify_password(password: str, stored: str) -> bool:
+    """Check a password against a stored hash; rows from before hashing hold the plaintext."""
+    if not is_hashed(stored):
+        return hmac.compare_digest(password.encode(), stored.encode())
+    try:
+        _, n, r, p, salt, digest = stored.split("$")
+        expected = _unb64(digest)
+        actual = _scrypt(password, _unb64(salt), int(n), int(r), int(p))
+    except ValueError:
+        return False
+    return hmac.compare_digest(actual, expected)
+
+
+# Verified against for unknown emails, so login takes as long whether or not the account exists.
+# Random salt and digest with the current parameters: costs the same scrypt run as a real hash.
+DUMMY_HASH = f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${_b64(os.urandom(SALT_BYTES))}${_b64(os.urandom(HASH_BYTES))}"
+
+
+def needs_rehash(stored: str) -> bool:
+    """True for plaintext rows and hashes made with other parameters than the current ones."""
+    if not is_hashed(stored):
+        return True
+    return stored.split("$")[1:4] != [str(SCRYPT_N), str(SCRYPT_R), str(SCRYPT_P)]
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=PASSWORD_WORKERS, thread_name_prefix="password")
+    return _executor
+
+
+async def _run(fn, *args):
+    global _pending, rejected
+    if _pending >= PASSWORD_MAX_PENDING:
+        rejected += 1
+        raise HTTPException(status_code=503, detail="Server busy, retry shortly", headers={"Retry-After": "1"})
+    _pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_get_executor(), fn, *args)
+    finally:
+        _pending -= 1
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run(hash_password, password)
+
+
+async def verify_password_async(password: str, stored: str) -> bool:
+    if not is_hashed(stored):
+        return verify_password(password, stored)  # plaintext compare: no CPU to offload
+    return await _run(verify_password, password, stored)
+
+
+def pending() -> int:
+    return _pending
+
+
+def shutdown_password_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -1,27 +1,110 @@
 # app/utils/plot_utils.py
-# Utilities to render matplotlib plots to PNG bytes.
+# Utilities to render matplotlib plots to PNG bytes, off the event loop.
 
+import asyncio
 import io
-import matplotlib.pyplot as plt
-from typing import List
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional
 
+from fastapi import HTTPException
 
-def plot_dates_values_png_bytes(dates: List[str], values: List[float], title: str = "Forecast"):
+# Rendering is CPU-bound (~100ms per figure); a small process pool keeps it off the
+# event loop and out of the GIL. Beyond PLOT_MAX_PENDING queued + running renders per worker
+# process, requests are turned away with 503 instead of queueing without bound.
+PLOT_WORKERS = int(os.getenv("PLOT_WORKERS", "2"))
+PLOT_MAX_PENDING = int(os.getenv("PLOT_MAX_PENDING", str(PLOT_WORKERS * 4)))
+
+_executor: Optional[ProcessPoolExecutor] = None
+_pending = 0
+rejected = 0
+
+
+def plot_dates_values_png_bytes(
+    dates: List[str],
+    values: List[float],
+    title: str = "Forecast",
+    width: float = 10,
+    height: float = 4.5,
+    dpi: int = 150,
+):
     """
     Create a line plot for given ISO date strings and numeric values.
     Return PNG bytes (not base64) ready for StreamingResponse.
+    Uses the object-oriented Figure API: no pyplot global state, safe in threads and subprocesses.
     """
-    plt.figure(figsize=(10, 4.5))
-    plt.plot(dates, values, marker="o", linestyle="-")
-    plt.xticks(rotation=45)
-    plt.title(title)
-    plt.xlabel("Date")
-    plt.ylabel("Rainfall")
-    plt.grid(True)
-    plt.tight_layout()
+    # Imported on first use: matplotlib costs hundreds of ms at import and only plot workers need it.
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(width, height))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    ax.plot(dates, values, marker="o", linestyle="-")
+    ax.tick_params(axis="x", labelrotation=45)
+    ax.set_title(title)
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Rainfall")
+    ax.grid(True)
+    fig.tight_layout()
 
     buf = io.BytesIO()
-    plt.savefig(buf, format="png", dpi=150)
-    plt.close()
-    buf.seek(0)
+    fig.savefig(buf, format="png", dpi=dpi)
     return buf.getvalue()
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # spawn: never fork a process that is running an event loop and DB pool threads
+        _executor = ProcessPoolExecutor(max_workers=PLOT_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _executor
+
+
+async def render_png(dates: List[str], values: List[float], title: str, width: float, height: float, dpi: int) -> bytes:
+    """Render in the process pool; 503 once PLOT_MAX_PENDING renders are queued or running."""
+    global _pending, rejected
+    if _pending >= PLOT_MAX_PENDING:
+        rejected += 1
+        raise HTTPException(status_code=503, detail="Server busy, retry shortly", headers={"Retry-After": "1"})
+    _pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        args = (plot_dates_values_png_bytes, dates, values, title, width, height, dpi)
+        executor = _get_executor()
+        try:
+            future = loop.run_in_executor(executor, *args)
+        except BrokenProcessPool:
+            # A render child died earlier (e.g. OOM-killed): respawn the pool and go on
+            _discard_executor(executor)
+            executor = _get_executor()
+            future = loop.run_in_executor(executor, *args)
+        try:
+            return await future
+        except BrokenProcessPool:
+            # The child died during this render; the next request gets a fresh pool
+            _discard_executor(executor)
+            raise HTTPException(status_code=503, detail="Plot renderer restarted, retry shortly", headers={"Retry-After": "1"})
+    finally:
+        _pending -= 1
+
+
+def _discard_executor(executor: ProcessPoolExecutor):
+    """Drop a broken pool (unless another request already replaced it) so _get_executor() respawns one."""
+    global _executor
+    if _executor is executor:
+        _executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def pending() -> int:
+    return _pending
+
+
+def shutdown_plot_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,351 @@
+# app/utils/rate_limit.py
+# Per-client, per-route token buckets and a global concurrency cap, applied as ASGI middleware
+# before routing (so throttled requests never reach get_db).
+
+import asyncio
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from starlette.datastructures import MutableHeaders
+
+from app.utils.fast_json import FastJSONResponse
+
+# Off switch (benchmarks, local debugging); admission control stays on
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() in ("1", "true", "yes")
+# Which X-Forwarded-For entry identifies the client, counted from the right: 1 = the address the nearest
+# proxy saw (Render's router, set in render.yaml). 0, the default, ignores the header and uses the socket
+# peer: without a proxy in front, clients could pick their own bucket by sending the header.
+RATE_LIMIT_PROXY_HOPS = int(os.getenv("RATE_LIMIT_PROXY_HOPS", "0"))
+# Buckets kept in memory per worker; the least recently used client is forgotten first
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+# Limit for routes not listed in the rules, as "count/seconds[/burst]" (e.g. "300/60/60"); unset, they are not
+# limited. Off by default: a server-side frontend (the Streamlit app) sends every user's requests from one address.
+RATE_LIMIT_DEFAULT = os.getenv("RATE_LIMIT_DEFAULT", "").strip()
+# Comma-separated client addresses that skip the buckets (e.g. the frontend's egress address)
+RATE_LIMIT_EXEMPT_CLIENTS = [addr.strip() for addr in os.getenv("RATE_LIMIT_EXEMPT_CLIENTS", "").split(",") if addr.strip()]
+
+
+class RateLimit(NamedTuple):
+    rate: float  # tokens added per second
+    burst: int  # bucket capacity
+
+
+def limit(count: int, per_seconds: float, burst: Optional[int] = None) -> RateLimit:
+    """limit(30, 60): 30 requests per minute on average, up to `burst` (default 30) back to back."""
+    return RateLimit(rate=count / per_seconds, burst=burst if burst is not None else count)
+
+
+def parse_limit(text: str) -> Optional[RateLimit]:
+    """"300/60" -> limit(300, 60); "300/60/60" -> limit(300, 60, burst=60); "" -> None."""
+    if not text:
+        return None
+    parts = text.split("/")
+    if len(parts) not in (2, 3):
+        raise ValueError(f"Rate limit {text!r} is not count/seconds[/burst]")
+    count, per_seconds = int(parts[0]), float(parts[1])
+    burst = int(parts[2]) if len(parts) == 3 else None
+    if count <= 0 or per_seconds <= 0 or (burst is not None and burst <= 0):
+        raise ValueError(f"Rate limit {text!r} must be positive")
+    return limit(count, per_seconds, burst)
+
+
+class Decision(NamedTuple):
+    allowed: bool
+    remaining: int
+    retry_after: float  # seconds until a token is available (0 when allowed)
+
+
+def _take(tokens: float, updated: float, now: float, rule: RateLimit, cost: float) -> Tuple[float, Decision]:
+    """Refill a bucket last seen at `updated` holding `tokens`, then try to spend `cost`."""
+    tokens = min(float(rule.burst), tokens + max(0.0, now - updated) * rule.rate)
+    if tokens >= cost:
+        tokens -= cost
+        return tokens, Decision(True, int(tokens), 0.0)
+    return tokens, Decision(False, int(tokens), (cost - tokens) / rule.rate)
+
+
+# ---- Backends ----
+class InMemoryBackend:
+    """Buckets in this process only: each worker enforces its own share of the limit."""
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def take(self, key: str, rule: RateLimit, cost: float = 1.0) -> Decision:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (float(rule.burst), now))
+            tokens, decision = _take(tokens, updated, now, rule, cost)
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return decision
+
+    def size(self) -> int:
+        return len(self._buckets)
+
+
+class SharedStore:
+    """
+    The two operations SharedStoreBackend needs from a store every worker can reach
+    (e.g. Redis GET + WATCH/MULTI/EXEC, or memcached gets/cas). Values are short strings.
+    """
+
+    async def get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    async def compare_and_set(self, key: str, expected: Optional[str], value: str, ttl: float) -> bool:
+        """Store value (expiring after ttl seconds) only if the key still holds expected (None = absent)."""
+        raise NotImplementedError
+
+
+class LocalStore(SharedStore):
+    """In-process SharedStore stand-in, for exercising SharedStoreBackend without a server."""
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    async def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[1] < time.monotonic():
+                return None
+            return item[0]
+
+    async def compare_and_set(self, key: str, expected: Optional[str], value: str, ttl: float) -> bool:
+        with self._lock:
+            item = self._data.get(key)
+            current = item[0] if item is not None and item[1] >= time.monotonic() else None
+            if current != expected:
+                return False
+            self._data[key] = (value, time.monotonic() + ttl)
+            return True
+
+
+class SharedStoreBackend:
+    """
+    Buckets kept in a SharedStore, so the limit holds across workers.
+    Updates are optimistic (read, compute, compare-and-set, retry on conflict).
+    If the store errors or stays contended the request is let through: rate limiting
+    must not take the API down with it.
+    """
+
+    def __init__(self, store: SharedStore, prefix: str = "ratelimit:", max_attempts: int = 5):
+        self.store = store
+        self.prefix = prefix
+        self.max_attempts = max_attempts
+        self.failures = 0
+
+    async def take(self, key: str, rule: RateLimit, cost: float = 1.0) -> Decision:
+        store_key = self.prefix + key
+        # A full bucket needs no state: expire entries once they would have refilled anyway
+        ttl = rule.burst / rule.rate + 1
+        try:
+            for _ in range(self.max_attempts):
+                raw = await self.store.get(store_key)
+                now = time.time()  # wall clock: shared between processes
+                if raw is None:
+                    tokens, updated = float(rule.burst), now
+                else:
+                    tokens_text, _, updated_text = raw.partition(":")
+                    tokens, updated = float(tokens_text), float(updated_text)
+                tokens, decision = _take(tokens, updated, now, rule, cost)
+                if await self.store.compare_and_set(store_key, raw, f"{tokens:.4f}:{now:.4f}", ttl):
+                    return decision
+        except Exception:
+            pass
+        self.failures += 1
+        return Decision(True, 0, 0.0)
+
+
+# ---- Policy ----
+class RateLimiter:
+    """
+    Maps a request to its bucket: (client address, matching rule) -> backend.take().
+    rules keys are "METHOD /path"; METHOD may be "*" and a path ending in "*" matches by prefix
+    (longest prefix wins). Unlisted routes share one bucket per client, named "default", when `default`
+is set (a bucket per path would give every URL a fresh burst and /metrics a label per URL).
+Requests from `exempt_clients` are never limited.
+    """
+
+    def __init__(
+        self,
+        rules: Dict[str, RateLimit],
+        default: Optional[RateLimit] = None,
+        backend=None,
+        exempt: Iterable[str] = ("/status", "/metrics"),
+        exempt_clients: Iterable[str] = RATE_LIMIT_EXEMPT_CLIENTS,
+        proxy_hops: int = RATE_LIMIT_PROXY_HOPS,
+        enabled: bool = RATE_LIMIT_ENABLED,
+    ):
+        self.default = default
+        self.backend = backend if backend is not None else InMemoryBackend()
+        self.exempt = set(exempt)
+        self.exempt_clients = set(exempt_clients)
+        self.proxy_hops = proxy_hops
+        self.enabled = enabled
+        self._exact: Dict[Tuple[str, str], Tuple[str, RateLimit]] = {}
+        self._prefixes: List[Tuple[str, str, str, RateLimit]] = []
+        for key, rule in rules.items():
+            method, _, path = key.partition(" ")
+            if path.endswith("*"):
+                self._prefixes.append((method.upper(), path[:-1], key, rule))
+            else:
+                self._exact[(method.upper(), path)] = (key, rule)
+        self._prefixes.sort(key=lambda item: len(item[1]), reverse=True)
+        self.allowed = 0
+        self.throttled: Dict[str, int] = {}
+
+    def rule_for(self, method: str, path: str) -> Optional[Tuple[str, RateLimit]]:
+        """(bucket name, rule) for a request, or None when it is not limited."""
+        if path in self.exempt:
+            return None
+        match = self._exact.get((method, path)) or self._exact.get(("*", path))
+        if match is not None:
+            return match
+        for rule_method, prefix, key, rule in self._prefixes:
+            if rule_method in (method, "*") and path.startswith(prefix):
+                return key, rule
+        if self.default is not None:
+            return "default", self.default
+        return None
+
+    def client_id(self, scope) -> str:
+        if self.proxy_hops > 0:
+            for name, value in scope.get("headers", ()):
+                if name == b"x-forwarded-for":
+                    hops = [hop.strip() for hop in value.decode("latin-1").split(",") if hop.strip()]
+                    if hops:
+                        return hops[-min(self.proxy_hops, len(hops))]
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    async def check(self, scope) -> Optional[Tuple[RateLimit, Decision]]:
+        """The rule and decision for this request, or None when it is not limited."""
+        if not self.enabled:
+            return None
+        match = self.rule_for(scope["method"], scope["path"])
+        if match is None:
+            return None
+        name, rule = match
+        client = self.client_id(scope)
+        if client in self.exempt_clients:
+            return None
+        decision = await self.backend.take(f"{client}|{name}", rule)
+        if decision.allowed:
+            self.allowed += 1
+        else:
+            self.throttled[name] = self.throttled.get(name, 0) + 1
+        return rule, decision
+
+
+class AdmissionControl:
+    """
+    Caps requests in flight per worker. Past max_concurrency, up to max_queue requests wait
+    (at most queue_timeout seconds) for a slot in arrival order; the rest are shed with 503.
+    Routes in `exempt` (long-polls, health checks) neither take nor wait for a slot.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int, queue_timeout: float, exempt: Iterable[str] = ()):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.exempt = set(exempt)
+        self.in_flight = 0
+        self.shed = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> bool:
+        """Take a slot; False means shed. Single event loop: the checks below cannot interleave."""
+        if self.in_flight < self.max_concurrency and not self._waiters:
+            self.in_flight += 1
+            return True
+        if len(self._waiters) >= self.max_queue:
+            self.shed += 1
+            return False
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            # release() hands its slot straight to us, so in_flight is already counted
+            await asyncio.wait_for(waiter, self.queue_timeout)
+            return True
+        except asyncio.TimeoutError:
+            self.shed += 1
+            return False
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()  # the client went away after being handed a slot: pass it on
+            raise
+        finally:
+            try:
+                self._waiters.remove(waiter)
+            except ValueError:
+                pass
+
+    def release(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+
+# ---- ASGI middleware ----
+class RateLimitMiddleware:
+    """
+    429 (with Retry-After) when the client's bucket for the route is empty, 503 when the
+    worker is saturated. Limited responses carry X-RateLimit-Limit / X-RateLimit-Remaining.
+    """
+
+    def __init__(self, app, limiter: RateLimiter, admission: Optional[AdmissionControl] = None):
+        self.app = app
+        self.limiter = limiter
+        self.admission = admission
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        checked = await self.limiter.check(scope)
+        if checked is not None:
+            rule, decision = checked
+            headers = {"X-RateLimit-Limit": str(rule.burst), "X-RateLimit-Remaining": str(decision.remaining)}
+            if not decision.allowed:
+                headers["Retry-After"] = str(max(1, math.ceil(decision.retry_after)))
+                response = FastJSONResponse({"detail": "Rate limit exceeded"}, status_code=429, headers=headers)
+                await response(scope, receive, send)
+                return
+
+            inner_send = send
+
+            async def send(message):
+                if message["type"] == "http.response.start":
+                    MutableHeaders(raw=message["headers"]).update(headers)
+                await inner_send(message)
+
+        admission = self.admission
+        if admission is None or scope["path"] in admission.exempt:
+            await self.app(scope, receive, send)
+            return
+        if not await admission.acquire():
+            response = FastJSONResponse(
+                {"detail": "Server busy, retry shortly"}, status_code=503, headers={"Retry-After": "1"}
+            )
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            admission.release()
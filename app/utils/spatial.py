@@ -0,0 +1,128 @@
+# app/utils/spatial.py
+# In-memory nearest-location index: a uniform grid over points on the unit sphere.
+
+import math
+import os
+import threading
+from itertools import product
+from typing import Dict, List, Optional, Tuple
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Grid cell edge, in km of chord on the Earth's surface; about the spacing of stations
+SPATIAL_CELL_KM = float(os.getenv("SPATIAL_CELL_KM", "50"))
+
+
+def _unit_vector(lat: float, lon: float) -> Tuple[float, float, float]:
+    phi, lam = math.radians(lat), math.radians(lon)
+    return (math.cos(phi) * math.cos(lam), math.cos(phi) * math.sin(lam), math.sin(phi))
+
+
+def _chord_to_km(chord: float) -> float:
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, chord / 2))
+
+
+def _shell(radius: int):
+    """Offsets of the cells at Chebyshev distance exactly radius (the surface of a cube)."""
+    span = range(-radius, radius + 1)
+    for dx, dy in product(span, span):
+        if abs(dx) == radius or abs(dy) == radius:
+            for dz in span:
+                yield dx, dy, dz
+        else:
+            yield dx, dy, -radius
+            if radius:
+                yield dx, dy, radius
+
+
+class GridIndex:
+    """
+    Points are stored as 3-D unit vectors bucketed into cubic cells, so there are no
+    date-line or pole special cases and chord length orders points like great-circle distance.
+    upsert()/remove() are O(1): the index is updated in place as locations are posted.
+    nearest() searches shells of cells outward from the query's cell, and stops once no
+    unvisited cell can hold anything closer.
+    """
+
+    def __init__(self, cell_km: float = SPATIAL_CELL_KM):
+        self.cell = cell_km / EARTH_RADIUS_KM
+        self._cells: Dict[Tuple[int, int, int], Dict[str, Tuple[float, float, float]]] = {}
+        self._points: Dict[str, Tuple[Tuple[int, int, int], Tuple[float, float, float], float, float]] = {}
+        self._lock = threading.Lock()
+        self.loaded = False
+
+    def _cell_of(self, vector) -> Tuple[int, int, int]:
+        return tuple(math.floor(c / self.cell) for c in vector)
+
+    def upsert(self, key: str, lat: float, lon: float):
+        vector = _unit_vector(lat, lon)
+        cell = self._cell_of(vector)
+        with self._lock:
+            self._remove_locked(key)
+            self._cells.setdefault(cell, {})[key] = vector
+            self._points[key] = (cell, vector, lat, lon)
+
+    def remove(self, key: str):
+        with self._lock:
+            self._remove_locked(key)
+
+    def _remove_locked(self, key: str):
+        entry = self._points.pop(key, None)
+        if entry is None:
+            return
+        bucket = self._cells[entry[0]]
+        del bucket[key]
+        if not bucket:
+            del self._cells[entry[0]]
+
+    def clear(self):
+        with self._lock:
+            self._cells.clear()
+            self._points.clear()
+            self.loaded = False
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def nearest(self, lat: float, lon: float, k: int = 1, max_km: Optional[float] = None) -> List[Tuple[str, float]]:
+        """Up to k (key, distance_km) pairs, closest first, optionally within max_km."""
+        query = _unit_vector(lat, lon)
+        cx, cy, cz = self._cell_of(query)
+        max_chord = 2 * math.sin(max_km / (2 * EARTH_RADIUS_KM)) if max_km is not None else None
+        best: List[Tuple[float, str]] = []
+
+        def consider(bucket):
+            for key, vector in bucket.items():
+                best.append((math.dist(query, vector), key))
+
+        with self._lock:
+            radius = 0
+            while True:
+                # Past this shell size, scanning every occupied cell is cheaper than walking empty ones
+                if (2 * radius + 1) ** 3 >= len(self._cells):
+                    best.clear()
+                    for bucket in self._cells.values():
+                        consider(bucket)
+                    break
+                for dx, dy, dz in _shell(radius):
+                    bucket = self._cells.get((cx + dx, cy + dy, cz + dz))
+                    if bucket:
+                        consider(bucket)
+                # Anything in an unvisited cell is at least radius cells (chord) away
+                reach = radius * self.cell
+                best.sort()
+                if len(best) >= k and best[k - 1][0] <= reach:
+                    break
+                if max_chord is not None and reach >= max_chord:
+                    break
+                radius += 1
+
+        best.sort()
+        return [
+            (key, round(_chord_to_km(chord), 3))
+            for chord, key in best[:k]
+            if max_chord is None or chord <= max_chord
+        ]
+
+
+location_index = GridIndex()
@@ -0,0 +1,339 @@
+# benchmarks/routes.py
+# Load test for every router plus micro-benchmarks, fully in-process (no network, no server).
+#
+# Seeds N users, M queries and K forecasts through app.models into a throwaway SQLite file
+# (or --database-url), then drives each endpoint concurrently through an ASGI client.
+#
+# Usage (from the repo root; needs httpx, see requirements-dev.txt):
+#   python benchmarks/routes.py [--users 200] [--queries 2000] [--forecasts 500]
+#                               [--requests 500] [--concurrency 20] [--output bench_output.txt]
+# Prints one JSON document (p50/p95/p99 latency, req/s, DB queries per request per endpoint)
+# so runs can be compared between commits.
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+BENCH_PASSWORD = "bench-pw"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="In-process load test of every router, plus micro-benchmarks.")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--forecasts", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=500, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--database-url", default=None, help="defaults to a fresh SQLite file")
+    parser.add_argument("--only", default=None, help="comma-separated endpoint names to run")
+    parser.add_argument("--skip-micro", action="store_true")
+    parser.add_argument("--output", default=None, help="write JSON here instead of stdout")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--plaintext-passwords", action="store_true", help="seed legacy plaintext passwords")
+    parser.add_argument("--accept-encoding", default="gzip, br",
+                        help='sent on every request; "identity" measures uncompressed responses')
+    return parser.parse_args()
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize_latencies(latencies, elapsed, errors, rejected, queries, wire_bytes, body_bytes, cpu_seconds):
+    ordered = sorted(latencies)
+    ms = lambda v: round(v * 1000, 3) if v is not None else None  # noqa: E731
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rejected_503": rejected,
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else None,
+        "p50_ms": ms(percentile(ordered, 50)),
+        "p95_ms": ms(percentile(ordered, 95)),
+        "p99_ms": ms(percentile(ordered, 99)),
+        "mean_ms": ms(statistics.fmean(ordered)) if ordered else None,
+        "db_queries_per_request": round(queries / len(latencies), 2) if latencies else None,
+        # bytes as sent (after Content-Encoding) vs decoded; CPU is this process's, app and client together
+        "wire_bytes_per_response": round(wire_bytes / len(latencies)) if latencies else None,
+        "body_bytes_per_response": round(body_bytes / len(latencies)) if latencies else None,
+        "cpu_ms_per_request": round(cpu_seconds / len(latencies) * 1000, 3) if latencies else None,
+    }
+
+
+async def seed(args):
+    """Bulk-insert users, queries and forecasts directly through the ORM models."""
+    from sqlalchemy import insert
+    from app.database import SessionLocal, engine
+    from app import models
+
+    from app.utils.passwords import hash_password
+
+    rng = random.Random(args.seed)
+    now = datetime.utcnow()
+    # One hash shared by every user (hashing each one would dominate seeding time);
+    # --plaintext-passwords seeds pre-hashing rows instead, so logins measure the rehash path.
+    password = BENCH_PASSWORD if args.plaintext_passwords else hash_password(BENCH_PASSWORD)
+    async with SessionLocal() as db:
+        await db.execute(insert(models.User), [
+            {"id": i, "email": f"user{i}@sail-bench.com", "username": f"user{i}", "password": password,
+             "created_at": now}
+            for i in range(1, args.users + 1)
+        ])
+        await db.execute(insert(models.UserQuery), [
+            {"user_id": rng.randint(1, args.users), "query_text": f"Will it rain tomorrow? #{i}",
+             "created_at": now - timedelta(seconds=args.queries - i),
+             "response_text": "Light showers expected." if i % 2 else None,
+             "response_time": now if i % 2 else None}
+            for i in range(args.queries)
+        ])
+        forecast_rows = [
+            {"forecast_type": "daily" if i % 2 else "monthly",
+             "created_at": now - timedelta(minutes=args.forecasts - i)}
+            for i in range(args.forecasts)
+        ]
+        ids = (await db.execute(
+            insert(models.Forecast).returning(models.Forecast.id, sort_by_parameter_order=True), forecast_rows
+        )).scalars().all()
+        points = []
+        for forecast_id, row in zip(ids, forecast_rows):
+            count = 7 if row["forecast_type"] == "daily" else 3
+            step = 1 if row["forecast_type"] == "daily" else 30
+            points += [
+                {"forecast_id": forecast_id, "date": date(2024, 1, 1) + timedelta(days=j * step),
+                 "rainfall": round(rng.uniform(0, 40), 1)}
+                for j in range(count)
+            ]
+        await db.execute(insert(models.ForecastPoint), points)
+        await db.commit()
+
+    from app.migrations.latest_query import backfill_latest_query_ids
+    async with engine.begin() as conn:
+        await conn.run_sync(backfill_latest_query_ids)
+
+
+def scenarios(args):
+    """name -> (method, url, json body factory or None)."""
+    rng = random.Random(args.seed)
+    user = lambda: rng.randint(1, args.users)  # noqa: E731
+    daily_items = [{"date": (date(2024, 1, 1) + timedelta(days=d)).isoformat(), "rainfall": d * 1.5} for d in range(7)]
+    monthly_items = [{"date": f"2024-{m:02d}-01", "rainfall": m * 10.0} for m in (1, 2, 3)]
+    signups = itertools.count(1)
+    return {
+        "auth_signup": ("POST", lambda: "/auth/signup",
+                        lambda: (lambda n: {"email": f"new{n}@sail-bench.com", "username": f"new{n}", "password": BENCH_PASSWORD})(next(signups))),
+        "auth_login": ("POST", lambda: "/auth/login",
+                       lambda: {"email": f"user{user()}@sail-bench.com", "password": BENCH_PASSWORD}),
+        "user_input": ("POST", lambda: "/user_input",
+                       lambda: {"user_id": user(), "message": "How much rain this week?"}),
+        "chatbot_response_get": ("GET", lambda: f"/chatbot_response?user_id={user()}", None),
+        "chatbot_response_post": ("POST", lambda: "/chatbot_response",
+                                  lambda: {"user_id": user(), "response_text": "Expect 12mm on Tuesday."}),
+        "chatbot_history": ("GET", lambda: f"/chatbot_history?user_id={user()}&limit=50", None),
+        "daily_forecast_get": ("GET", lambda: f"/daily_forecast?user_id={user()}", None),
+        "monthly_forecast_get": ("GET", lambda: f"/monthly_forecast?user_id={user()}", None),
+        "forecast_summary_get": ("GET", lambda: f"/forecast_summary?user_id={user()}", None),
+        "daily_forecast_post": ("POST", lambda: "/daily_forecast", lambda: daily_items),
+        "monthly_forecast_post": ("POST", lambda: "/monthly_forecast", lambda: monthly_items),
+        "forecasts_history": ("GET", lambda: "/forecasts?limit=50", None),
+    }
+
+
+async def run_scenario(client, method, url_factory, body_factory, total, concurrency):
+    latencies, errors, rejected, wire_bytes, body_bytes = [], 0, 0, 0, 0
+    remaining = iter(range(total))
+
+    async def worker():
+        nonlocal errors, rejected, wire_bytes, body_bytes
+        for _ in remaining:
+            url = url_factory()
+            body = body_factory() if body_factory else None
+            start = time.perf_counter()
+            response = await client.request(method, url, json=body)
+            await response.aread()
+            latencies.append(time.perf_counter() - start)
+            wire_bytes += response.num_bytes_downloaded
+            body_bytes += len(response.content)
+            # 404 "No queries found" is a valid outcome for users without history;
+            # 503 is deliberate back-pressure and counted on its own
+            if response.status_code == 503:
+                rejected += 1
+            elif response.status_code >= 500 or response.status_code in (400, 401, 422):
+                errors += 1
+
+    start, cpu_start = time.perf_counter(), time.process_time()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return (latencies, time.perf_counter() - start, errors, rejected,
+            wire_bytes, body_bytes, time.process_time() - cpu_start)
+
+
+async def run_load(args):
+    import httpx
+    from sqlalchemy import event
+    from app.main import app
+    from app.database import engine
+
+    query_count = 0
+
+    def count_query(*_):
+        nonlocal query_count
+        query_count += 1
+
+    results = {}
+    async with app.router.lifespan_context(app):
+        await seed(args)
+        event.listen(engine.sync_engine, "after_cursor_execute", count_query)
+        transport = httpx.ASGITransport(app=app)
+        headers = {"Accept-Encoding": args.accept_encoding}
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers) as client:
+            selected = set(args.only.split(",")) if args.only else None
+            for name, (method, url_factory, body_factory) in scenarios(args).items():
+                if selected and name not in selected:
+                    continue
+                # Warm-up (caches, pool) is excluded from the numbers
+                await run_scenario(client, method, url_factory, body_factory, min(20, args.requests), 1)
+                before = query_count
+                latencies, elapsed, errors, rejected, wire, body, cpu = await run_scenario(
+                    client, method, url_factory, body_factory, args.requests, args.concurrency
+                )
+                results[name] = summarize_latencies(
+                    latencies, elapsed, errors, rejected, query_count - before, wire, body, cpu
+                )
+        event.remove(engine.sync_engine, "after_cursor_execute", count_query)
+    return results
+
+
+def timeit(fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    elapsed = time.perf_counter() - start
+    return {"iterations": iterations, "mean_us": round(elapsed / iterations * 1e6, 2)}
+
+
+def encoding_micro(name, payload):
+    """Serialize one response body with stdlib json and fast_json, then compress it: CPU and bytes."""
+    import zlib
+    from app.utils import fast_json
+    from app.utils.compression import BROTLI_QUALITY, GZIP_LEVEL, brotli
+
+    raw = fast_json.dumps(payload)
+    results = {
+        f"{name}_json_stdlib": timeit(lambda: json.dumps(payload).encode(), 500),
+        f"{name}_fast_json": timeit(lambda: fast_json.dumps(payload), 500),
+        f"{name}_gzip": timeit(lambda: zlib.compress(raw, GZIP_LEVEL), 500),
+    }
+    sizes = {"json_stdlib": len(json.dumps(payload).encode()), "fast_json": len(raw),
+             "gzip": len(zlib.compress(raw, GZIP_LEVEL))}
+    if brotli is not None:
+        results[f"{name}_brotli"] = timeit(lambda: brotli.compress(raw, quality=BROTLI_QUALITY), 500)
+        sizes["brotli"] = len(brotli.compress(raw, quality=BROTLI_QUALITY))
+    results[f"{name}_bytes"] = sizes
+    return results
+
+
+def rate_limit_micro():
+    """Cost of one token-bucket decision, in-process and through the SharedStore stand-in."""
+    from app.utils.rate_limit import InMemoryBackend, LocalStore, SharedStoreBackend, limit
+
+    rule = limit(10 ** 9, 1)
+    keys = [f"10.0.{i // 256}.{i % 256}|GET /daily_forecast" for i in range(1000)]
+    iterations = 20000
+
+    async def take_all(backend):
+        start = time.perf_counter()
+        for i in range(iterations):
+            await backend.take(keys[i % len(keys)], rule)
+        return {"iterations": iterations, "mean_us": round((time.perf_counter() - start) / iterations * 1e6, 2)}
+
+    results = {}
+    for name, backend in (("memory", InMemoryBackend()), ("shared_local_store", SharedStoreBackend(LocalStore()))):
+        results[f"rate_limit_take_{name}"] = asyncio.run(take_all(backend))
+    return results
+
+
+def run_micro():
+    from app import crud, schemas
+    from app.utils.plot_utils import plot_dates_values_png_bytes
+    from app.utils.passwords import hash_password, verify_password
+
+    week = [(date(2024, 1, 1) + timedelta(days=d), d * 1.5) for d in range(7)]
+    year = [(date(2024, 1, 1) + timedelta(days=d), d * 0.1) for d in range(365)]
+    year_series = crud.item_columns([schemas.ForecastItem(date=d, rainfall=v) for d, v in year])
+    dates = [d.isoformat() for d, _ in week]
+    values = [v for _, v in week]
+    now = datetime.utcnow()
+    history_page = {"user_id": 1, "next_before": "MjAyNC0wMS0wMVQwMDowMDowMHwx", "items": [
+        {"query_id": i, "query_text": f"Will it rain tomorrow? #{i}", "response_text": "Light showers expected.",
+         "response_time": now.isoformat(), "created_at": now.isoformat()}
+        for i in range(50)
+    ]}
+    return {
+        **encoding_micro("encode_forecast_365", crud.format_forecast_columns(*year_series, "day")),
+        **encoding_micro("encode_chatbot_history_50", history_page),
+        **rate_limit_micro(),
+        "format_forecast_points_7": timeit(lambda: crud.format_forecast_points(week, "day"), 20000),
+        "format_forecast_points_365": timeit(lambda: crud.format_forecast_points(year, "day"), 500),
+        "format_forecast_columns_365": timeit(lambda: crud.format_forecast_columns(*year_series, "day"), 500),
+        "forecast_columns_body_365": timeit(lambda: crud.forecast_columns_body(*year_series, "day"), 500),
+        "hash_password_scrypt": timeit(lambda: hash_password(BENCH_PASSWORD), 20),
+        "verify_password_scrypt": (lambda stored: timeit(lambda: verify_password(BENCH_PASSWORD, stored), 20))(
+            hash_password(BENCH_PASSWORD)),
+        "plot_dates_values_png_bytes_150dpi": timeit(lambda: plot_dates_values_png_bytes(dates, values), 10),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    args = parse_args()
+    tmpdir = tempfile.mkdtemp(prefix="sail-bench-")
+    # Must be set before app.database is imported
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"
+    # Every simulated client shares one address: per-client buckets would throttle the whole run.
+    # Admission control stays on (its 503s are counted in rejected_503).
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+    report = {
+        "benchmark": "routes",
+        "revision": git_revision(),
+        "python": sys.version.split()[0],
+        "database": os.environ["DATABASE_URL"].split(":", 1)[0],
+        "params": {k: getattr(args, k) for k in ("users", "queries", "forecasts", "requests", "concurrency",
+                                                 "accept_encoding")},
+        "endpoints": asyncio.run(run_load(args)),
+    }
+    if not args.skip_micro:
+        report["micro"] = run_micro()
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as fh:
+            fh.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
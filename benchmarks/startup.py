@@ -0,0 +1,94 @@
+# benchmarks/startup.py
+# Cold-start benchmark: time from process start to first 200 on /status, plus bare `import app.main`.
+#
+# Usage (from the repo root):
+#   python benchmarks/startup.py [--runs 5] [--database-url sqlite:////tmp/bench.db]
+# Prints one JSON document to stdout so results can be diffed between commits.
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SNIPPET = (
+    "import time; t = time.perf_counter(); import app.main; "
+    "print(time.perf_counter() - t)"
+)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_import(env) -> float:
+    out = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET], cwd=ROOT, env=env, check=True, capture_output=True, text=True
+    )
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def time_first_status(env, timeout: float = 60.0) -> float:
+    port = _free_port()
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/status", timeout=1) as resp:
+                    if resp.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.01)
+        raise RuntimeError(f"/status did not answer within {timeout}s")
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def summarize(samples):
+    return {
+        "runs": len(samples),
+        "min_s": round(min(samples), 4),
+        "median_s": round(statistics.median(samples), 4),
+        "max_s": round(max(samples), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start benchmark: process start to first /status response, and bare `import app.main`.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--database-url", default=None, help="defaults to a fresh SQLite file")
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="sail-startup-")
+    env = dict(os.environ)
+    env["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"
+
+    import_samples = [time_import(env) for _ in range(args.runs)]
+    # First run creates the schema; later runs measure a warm database like a redeploy does.
+    status_samples = [time_first_status(env) for _ in range(args.runs)]
+
+    print(json.dumps({
+        "benchmark": "startup",
+        "python": sys.version.split()[0],
+        "database": env["DATABASE_URL"].split(":", 1)[0],
+        "import_app_main": summarize(import_samples),
+        "process_start_to_first_status": summarize(status_samples),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
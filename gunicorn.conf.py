@@ -0,0 +1,29 @@
+# gunicorn.conf.py
+# Multi-worker deployment: gunicorn supervises WEB_CONCURRENCY uvicorn worker processes.
+#   gunicorn app.main:app -c gunicorn.conf.py
+# Startup work (schema, seeding) runs once under a lock (app/database.py: startup_lock), each worker
+# sizes its DB pool from DB_CONNECTION_BUDGET / WEB_CONCURRENCY, and caches are kept coherent across
+# workers by the invalidation bus (app/invalidation.py).
+
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+worker_class = "uvicorn_worker.UvicornWorker"
+workers = int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count())))
+# Workers read it to size their DB pools (app/database.py)
+os.environ["WEB_CONCURRENCY"] = str(workers)
+
+# SIGTERM: workers stop accepting, release long-polls and finish in-flight requests (app/utils/drain.py).
+# Render sends SIGKILL 30s after SIGTERM by default; finish before that.
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "25"))
+# A worker that does not heartbeat for this long is restarted
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+# Seconds an idle keep-alive connection stays open (below the proxy's idle timeout)
+keepalive = int(os.getenv("KEEPALIVE", "5"))
+# Recycle workers now and then (memory growth); jitter keeps them from restarting together
+max_requests = int(os.getenv("MAX_REQUESTS", "0"))
+max_requests_jitter = max(1, max_requests // 10) if max_requests else 0
+
+# Access log on stdout, as plain uvicorn does
+accesslog = "-"
@@ -0,0 +1,58 @@
+# tests/test_columnar.py
+# Columnar JSON uploads are validated as strictly as the row format.
+
+import pytest
+
+from app.utils import columnar
+
+INVALID_DATES = [
+    pytest.param([1, 2], id="epoch-day ints"),
+    pytest.param([True, False], id="booleans"),
+    pytest.param(["2021-10"], id="year-month"),
+    pytest.param(["2021-10-10T12:00"], id="datetime"),
+    pytest.param(["2021-13-01"], id="month out of range"),
+    pytest.param([None], id="null"),
+    pytest.param([["2021-10-10"]], id="nested"),
+]
+INVALID_VALUES = [
+    pytest.param(["1.5"], id="numeric string"),
+    pytest.param([True], id="boolean"),
+    pytest.param([None], id="null"),
+    pytest.param([[1.0]], id="nested"),
+]
+
+
+@pytest.mark.parametrize("dates", INVALID_DATES)
+def test_invalid_dates_rejected(dates):
+    with pytest.raises(columnar.ColumnarError):
+        columnar.from_json_columns(dates, [1.0] * len(dates))
+
+
+@pytest.mark.parametrize("values", INVALID_VALUES)
+def test_invalid_values_rejected(values):
+    with pytest.raises(columnar.ColumnarError):
+        columnar.from_json_columns(["2021-10-10"] * len(values), values)
+
+
+def test_valid_columns_accepted():
+    dates, values = columnar.from_json_columns(["2021-10-10", "2021-10-11"], [1, 2.5])
+    assert columnar.iso_dates(dates) == ["2021-10-10", "2021-10-11"]
+    assert values.tolist() == [1.0, 2.5]
+
+
+@pytest.mark.parametrize("dates", INVALID_DATES)
+def test_upload_with_invalid_dates_is_422(client, dates):
+    response = client.post("/daily_forecast", json={"dates": dates, "values": [1.0] * len(dates)})
+    assert response.status_code == 422
+
+
+@pytest.mark.parametrize("values", INVALID_VALUES)
+def test_upload_with_invalid_values_is_422(client, values):
+    response = client.post("/daily_forecast", json={"dates": ["2021-10-10"] * len(values), "values": values})
+    assert response.status_code == 422
+
+
+def test_columnar_upload_stored(client):
+    response = client.post("/daily_forecast", json={"dates": ["2021-10-10", "2021-10-11"], "values": [1, 2.5]})
+    assert response.status_code == 200
+    assert response.json()["records"] == 2
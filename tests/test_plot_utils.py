@@ -0,0 +1,56 @@
+# tests/test_plot_utils.py
+# The render process pool recovers after a child process dies.
+
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from app.utils import plot_utils
+
+
+def _render():
+    return plot_utils.render_png(["2021-10-10", "2021-10-11"], [1.0, 2.0], "Test", 4, 3, 50)
+
+
+def test_render_after_worker_killed():
+    async def scenario():
+        assert (await _render()).startswith(b"\x89PNG")
+        broken = plot_utils._executor
+        for process in list(broken._processes.values()):
+            process.kill()
+        # The pool notices the dead child in its management thread
+        deadline = time.monotonic() + 10
+        while not broken._broken and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        assert broken._broken
+
+        assert (await _render()).startswith(b"\x89PNG")
+        assert plot_utils._executor is not broken
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        plot_utils.shutdown_plot_executor()
+
+
+def test_worker_killed_during_render_is_503():
+    async def scenario():
+        await _render()  # spawn the pool
+        executor = plot_utils._executor
+        task = asyncio.ensure_future(_render())
+        await asyncio.sleep(0)
+        for process in list(executor._processes.values()):
+            process.kill()
+        with pytest.raises(HTTPException) as info:
+            await task
+        assert info.value.status_code == 503
+        assert info.value.headers["Retry-After"] == "1"
+        assert plot_utils._executor is None
+        assert (await _render()).startswith(b"\x89PNG")
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        plot_utils.shutdown_plot_executor()
@@ -0,0 +1,70 @@
+# tests/test_rate_limit.py
+# Bucket selection: the optional default rule, its fixed bucket name and exempt clients.
+
+import asyncio
+
+import pytest
+
+from app.utils.rate_limit import InMemoryBackend, RateLimiter, limit, parse_limit
+
+RULES = {"POST /auth/login": limit(2, 60), "PUT /locations/*": limit(60, 60)}
+
+
+def _scope(method, path, client="10.0.0.1"):
+    return {"type": "http", "method": method, "path": path, "headers": [], "client": (client, 1234)}
+
+
+def _statuses(limiter, scopes):
+    async def run():
+        results = []
+        for scope in scopes:
+            result = await limiter.check(scope)
+            results.append(None if result is None else result[1].allowed)
+        return results
+
+    return asyncio.run(run())
+
+
+def test_unlisted_routes_unlimited_without_default():
+    limiter = RateLimiter(RULES, enabled=True)
+    assert limiter.rule_for("GET", "/locations/abc") is None
+    assert _statuses(limiter, [_scope("GET", "/forecast")] * 5) == [None] * 5
+
+
+def test_default_is_one_bucket_per_client():
+    limiter = RateLimiter(RULES, default=limit(2, 60), backend=InMemoryBackend(), enabled=True)
+    assert limiter.rule_for("GET", "/locations/1") == ("default", limit(2, 60))
+    scopes = [_scope("GET", "/locations/1"), _scope("GET", "/locations/2"), _scope("GET", "/locations/3")]
+    assert _statuses(limiter, scopes) == [True, True, False]
+    assert limiter.throttled == {"default": 1}
+    # Another client has its own bucket
+    assert _statuses(limiter, [_scope("GET", "/locations/4", client="10.0.0.2")]) == [True]
+
+
+def test_listed_routes_keep_their_rule():
+    limiter = RateLimiter(RULES, default=limit(300, 60), enabled=True)
+    assert limiter.rule_for("PUT", "/locations/abc") == ("PUT /locations/*", limit(60, 60))
+    assert limiter.rule_for("POST", "/auth/login") == ("POST /auth/login", limit(2, 60))
+
+
+def test_exempt_clients_skip_buckets():
+    limiter = RateLimiter(RULES, default=limit(1, 60), exempt_clients=["10.0.0.9"], enabled=True)
+    frontend = [_scope("POST", "/auth/login", client="10.0.0.9")] * 5
+    assert _statuses(limiter, frontend) == [None] * 5
+    assert _statuses(limiter, [_scope("POST", "/auth/login")] * 3) == [True, True, False]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("", None),
+    ("300/60", limit(300, 60)),
+    ("300/60/60", limit(300, 60, burst=60)),
+    ("5/1.5", limit(5, 1.5)),
+])
+def test_parse_limit(text, expected):
+    assert parse_limit(text) == expected
+
+
+@pytest.mark.parametrize("text", ["300", "300/60/60/1", "a/60", "0/60", "10/0", "10/60/0"])
+def test_parse_limit_rejects(text):
+    with pytest.raises(ValueError):
+        parse_limit(text)